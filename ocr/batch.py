@@ -0,0 +1,362 @@
+"""
+Batch OCR over a directory or manifest of PDFs.
+
+Documents are spread over a bounded pool of worker processes; each one
+gets its own output folder (streamed output_blocks.ndjson plus the
+readable TXT / structured JSON). Progress is checkpointed, so an
+interrupted run can simply be started again:
+
+    python batch.py data/ --output-dir output/batch --jobs 4
+    python batch.py manifest.txt --output-dir output/batch   # one PDF path per line
+
+journal.jsonl (in --output-dir) records finished and failed documents;
+while a document is running, each finished page is checkpointed under
+<document>/pages/. A restarted run skips finished documents (unless the
+PDF changed) and, inside unfinished ones, only processes the pages that
+have no checkpoint yet.
+"""
+import argparse
+import glob
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from config import (
+    DPI, OCR_LANG, OCR_ENGINE, USE_TEXT_LAYER, TEXT_LAYER_MIN_WORDS, SKIP_BLANK_PAGES,
+    USE_EMBEDDED_IMAGES, RENDER_GRAYSCALE, ADAPTIVE_DPI,
+    TEXT_REGIONS, TEXT_REGION_THREADS, COARSE_DPI, REFINE_WEAK_WORDS, DESKEW_PAGES,
+    PIPELINE_STAGES,
+    OCR_CACHE_DIR, OCR_CACHE_MAX_BYTES, BLOCK_ID_FORMAT
+)
+
+from ocr.pipeline import iter_page_blocks
+from ocr.pdf_loader import count_pages
+from ocr.block_factory import set_id_format
+from ocr.block_stream import NdjsonBlockWriter, NdjsonBlockReader
+from ocr.tesseract_engine import configure_engine
+from ocr.ocr_cache import OcrCache
+from ocr.readable_formatter import save_readable_pages
+
+
+JOURNAL_NAME = "journal.jsonl"
+CHECKPOINT_NAME = "checkpoint.json"
+PAGES_DIR = "pages"
+BLOCKS_NAME = "output_blocks.ndjson"
+
+
+def collect_documents(source):
+    """
+    (key, pdf_path) pairs from a directory (searched recursively) or a
+    manifest file listing one PDF per line ('#' starts a comment; relative
+    paths are resolved against the manifest's folder). The key is the
+    document's relative path without ".pdf" (just its file name when it
+    lies outside that folder) and names its output folder. A file listed
+    twice is kept once; two different files with the same key raise
+    ValueError rather than share an output folder.
+    """
+    if os.path.isdir(source):
+        paths = sorted(glob.glob(os.path.join(source, "**", "*.pdf"), recursive=True))
+        base = source
+    else:
+        base = os.path.dirname(os.path.abspath(source))
+        paths = []
+        with open(source, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.split("#", 1)[0].strip()
+                if line:
+                    paths.append(line if os.path.isabs(line) else os.path.join(base, line))
+
+    documents = []
+    seen = {}
+    for path in paths:
+        relative = os.path.relpath(os.path.abspath(path), os.path.abspath(base))
+        if relative.startswith(".."):
+            relative = os.path.basename(path)
+        key = os.path.splitext(relative)[0].replace(os.sep, "/")
+
+        real_path = os.path.realpath(path)
+        if key in seen:
+            if seen[key] != real_path:
+                raise ValueError(
+                    f"{path} and {seen[key]} would share the output folder {key!r}"
+                )
+            continue
+
+        seen[key] = real_path
+        documents.append((key, path))
+
+    return documents
+
+
+def fingerprint(pdf_path):
+    """Cheap change detector for checkpointed documents."""
+    stat = os.stat(pdf_path)
+    return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def read_journal(path):
+    """Latest journal record per document key (torn last lines are ignored)."""
+    records = {}
+    if not os.path.exists(path):
+        return records
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            records[record["document"]] = record
+
+    return records
+
+
+def append_journal(path, record):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def write_page_checkpoint(pages_dir, page_num, blocks):
+    """Atomically persist one finished page (one block per line)."""
+    path = os.path.join(pages_dir, f"{page_num:06d}.ndjson")
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        for block in blocks:
+            f.write(json.dumps(block) + "\n")
+    os.replace(path + ".tmp", path)
+
+
+def read_page_checkpoint(pages_dir, page_num):
+    with open(os.path.join(pages_dir, f"{page_num:06d}.ndjson"), "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def finished_pages(doc_dir, source):
+    """
+    Pages checkpointed by an earlier run of this same PDF. Checkpoints of
+    a different version of the file are discarded.
+    """
+    pages_dir = os.path.join(doc_dir, PAGES_DIR)
+    marker = os.path.join(doc_dir, CHECKPOINT_NAME)
+
+    previous = None
+    if os.path.exists(marker):
+        with open(marker, "r", encoding="utf-8") as f:
+            previous = json.load(f).get("source")
+
+    if previous != source:
+        shutil.rmtree(pages_dir, ignore_errors=True)
+        with open(marker, "w", encoding="utf-8") as f:
+            json.dump({"source": source}, f)
+
+    os.makedirs(pages_dir, exist_ok=True)
+
+    return {
+        int(name.split(".")[0])
+        for name in os.listdir(pages_dir)
+        if name.endswith(".ndjson")
+    }
+
+
+def process_document(key, pdf_path, doc_dir, readable=True):
+    """
+    OCR one document into `doc_dir`, reusing pages finished by an earlier
+    run. Runs inside a pool worker; returns a summary for the journal.
+    """
+    configure_engine(OCR_ENGINE, lang=OCR_LANG)
+    set_id_format(BLOCK_ID_FORMAT)
+
+    cache = None
+    if OCR_CACHE_DIR:
+        cache = OcrCache(OCR_CACHE_DIR, max_bytes=OCR_CACHE_MAX_BYTES)
+
+    start = time.perf_counter()
+    os.makedirs(doc_dir, exist_ok=True)
+
+    source = fingerprint(pdf_path)
+    page_count = count_pages(pdf_path)
+    pages_dir = os.path.join(doc_dir, PAGES_DIR)
+
+    finished = finished_pages(doc_dir, source)
+    remaining = [n for n in range(1, page_count + 1) if n not in finished]
+
+    # Every page is checkpointed as soon as it is done...
+    for page_num, blocks in iter_page_blocks(
+        pdf_path,
+        dpi=DPI,
+        use_text_layer=USE_TEXT_LAYER,
+        text_layer_min_words=TEXT_LAYER_MIN_WORDS,
+        skip_blank_pages=SKIP_BLANK_PAGES,
+        embedded_images=USE_EMBEDDED_IMAGES,
+        grayscale=RENDER_GRAYSCALE,
+        text_regions=TEXT_REGIONS,
+        region_threads=TEXT_REGION_THREADS,
+        coarse_dpi=COARSE_DPI,
+        refine_words=REFINE_WEAK_WORDS,
+        deskew=DESKEW_PAGES,
+        adaptive_dpi=ADAPTIVE_DPI,
+        stages=PIPELINE_STAGES,
+        cache=cache,
+        page_numbers=remaining
+    ):
+        write_page_checkpoint(pages_dir, page_num, blocks)
+
+    # ...and the document output is assembled from the checkpoints, one
+    # page in memory at a time
+    blocks_path = os.path.join(doc_dir, BLOCKS_NAME)
+    with NdjsonBlockWriter(blocks_path + ".partial") as writer:
+        for page_num in range(1, page_count + 1):
+            writer.write_page(page_num, read_page_checkpoint(pages_dir, page_num))
+        writer.close(Source=pdf_path)
+    os.replace(blocks_path + ".partial", blocks_path)
+
+    if readable:
+        save_readable_pages(
+            NdjsonBlockReader(blocks_path).iter_pages(),
+            os.path.join(doc_dir, "output_blocks.json")
+        )
+
+    shutil.rmtree(pages_dir)
+    os.remove(os.path.join(doc_dir, CHECKPOINT_NAME))
+
+    return {
+        "document": key,
+        "status": "done",
+        "path": pdf_path,
+        "source": source,
+        "pages": page_count,
+        "pages_processed": len(remaining),
+        "pages_resumed": len(finished),
+        "seconds": time.perf_counter() - start,
+        "cache": cache.stats() if cache is not None else None
+    }
+
+
+def run_batch(documents, output_dir, jobs=1, readable=True):
+    """
+    Process `documents` ((key, path) pairs) with at most `jobs` documents
+    in flight, skipping ones the journal already marks done. Returns the
+    aggregate report.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    journal_path = os.path.join(output_dir, JOURNAL_NAME)
+    journal = read_journal(journal_path)
+
+    start = time.perf_counter()
+    results = []
+    skipped = []
+
+    pending = []
+    for key, path in documents:
+        record = journal.get(key)
+        if (
+            record is not None
+            and record["status"] == "done"
+            and record.get("source") == fingerprint(path)
+            and os.path.exists(os.path.join(output_dir, key, BLOCKS_NAME))
+        ):
+            skipped.append(key)
+            continue
+        pending.append((key, path))
+
+    print(f"✅ {len(documents)} documents: {len(skipped)} already done, {len(pending)} to process")
+
+    with ProcessPoolExecutor(max_workers=max(1, jobs)) as pool:
+        queue = iter(pending)
+        in_flight = {}
+
+        def submit_next():
+            for key, path in queue:
+                future = pool.submit(
+                    process_document, key, path, os.path.join(output_dir, key), readable
+                )
+                in_flight[future] = (key, path)
+                return True
+            return False
+
+        # Only `jobs` documents are queued at a time, so a huge manifest
+        # never turns into a huge backlog of pickled tasks
+        for _ in range(max(1, jobs)):
+            if not submit_next():
+                break
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                key, path = in_flight.pop(future)
+                try:
+                    record = future.result()
+                    print(
+                        f"✅ {key}: {record['pages']} pages "
+                        f"({record['pages_resumed']} resumed) in {record['seconds']:.1f}s"
+                    )
+                except Exception as e:
+                    record = {"document": key, "status": "failed", "path": path, "error": repr(e)}
+                    print(f"❌ {key}: {e!r}")
+
+                append_journal(journal_path, record)
+                results.append(record)
+                submit_next()
+
+    wall = time.perf_counter() - start
+    done = [r for r in results if r["status"] == "done"]
+    pages_processed = sum(r["pages_processed"] for r in done)
+
+    return {
+        "documents": len(documents),
+        "done": len(done),
+        "failed": len(results) - len(done),
+        "skipped": len(skipped),
+        "jobs": jobs,
+        "pages": sum(r["pages"] for r in done),
+        "pages_processed": pages_processed,
+        "pages_resumed": sum(r["pages_resumed"] for r in done),
+        "wall_seconds": wall,
+        "pages_per_sec": pages_processed / wall if wall else 0.0,
+        "results": results
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("source", help="directory of PDFs or a manifest file")
+    parser.add_argument("--output-dir", default="output/batch")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                        help="documents processed concurrently")
+    parser.add_argument("--no-readable", action="store_true",
+                        help="skip the readable TXT / structured JSON outputs")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    try:
+        documents = collect_documents(args.source)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    report = run_batch(documents, args.output_dir, args.jobs, not args.no_readable)
+
+    report_path = os.path.join(args.output_dir, "batch_report.json")
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(
+        f"✅ {report['done']} done, {report['failed']} failed, {report['skipped']} skipped; "
+        f"{report['pages_processed']} pages in {report['wall_seconds']:.1f}s "
+        f"({report['pages_per_sec']:.1f} pages/sec)"
+    )
+    print(f"✅ Saved batch report to: {report_path}")
+
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
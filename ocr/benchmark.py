@@ -0,0 +1,512 @@
+"""
+Reproducible benchmarks for the OCR pipeline.
+
+Runs the full pipeline and each stage in isolation over data/*.pdf plus
+synthetic N-page documents, records pages/sec, per-stage latency
+percentiles and peak memory, and compares the results with a stored
+baseline. The pipeline runs with the config.py flags main.py uses,
+recorded in the report as "pipeline_options".
+
+    python benchmark.py                                  # run, print report
+    python benchmark.py --save-baseline benchmarks/baseline.json
+    python benchmark.py --baseline benchmarks/baseline.json --threshold 0.15
+    python benchmark.py --replay output/output_blocks.json   # no Tesseract needed
+
+Pages that need OCR are benchmarked only when Tesseract is usable (or
+when --cache-dir points at a warm OcrCache). --replay feeds the WORD
+blocks of a saved Blocks JSON straight into post-processing, so the
+form/table/section heuristics can be benchmarked anywhere.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import fitz  # PyMuPDF
+import numpy as np
+
+from config import (
+    DPI, OCR_LANG, OCR_ENGINE, USE_TEXT_LAYER, TEXT_LAYER_MIN_WORDS, SKIP_BLANK_PAGES,
+    USE_EMBEDDED_IMAGES, RENDER_GRAYSCALE, ADAPTIVE_DPI,
+    TEXT_REGIONS, TEXT_REGION_THREADS, COARSE_DPI, REFINE_WEAK_WORDS, DESKEW_PAGES,
+    PIPELINE_STAGES, OCR_WORKERS
+)
+
+from ocr.pdf_loader import render_page, has_usable_text_layer, extract_text_layer_words
+from ocr.image_preprocessor import preprocess_image
+from ocr.word_blocks import extract_word_table, build_text_layer_word_table
+from ocr.block_factory import create_block
+from ocr.pipeline import iter_page_blocks, build_page_blocks
+from ocr.readable_formatter import format_readable_output, create_structured_json
+from ocr.block_index import BlockIndex
+from ocr.block_stream import load_blocks
+from ocr.tesseract_engine import configure_engine, get_engine
+from ocr.ocr_cache import OcrCache
+from ocr.instrumentation import Profiler, PageProfile, peak_rss_kb
+from ocr.raster_buffers import page_buffers
+
+
+SYNTHETIC_PAGE_COUNTS = (1, 10, 50)
+SYNTHETIC_SEED = 1234
+
+# iter_page_blocks options of the benchmarked pipeline: the config.py
+# flags main.py runs with, recorded in the report so results are only
+# compared against a baseline taken with the same pipeline
+PIPELINE_OPTIONS = {
+    "dpi": DPI,
+    "use_text_layer": USE_TEXT_LAYER,
+    "text_layer_min_words": TEXT_LAYER_MIN_WORDS,
+    "skip_blank_pages": SKIP_BLANK_PAGES,
+    "embedded_images": USE_EMBEDDED_IMAGES,
+    "grayscale": RENDER_GRAYSCALE,
+    "text_regions": TEXT_REGIONS,
+    "region_threads": TEXT_REGION_THREADS,
+    "coarse_dpi": COARSE_DPI,
+    "refine_words": REFINE_WEAK_WORDS,
+    "deskew": DESKEW_PAGES,
+    "adaptive_dpi": ADAPTIVE_DPI,
+    "stages": PIPELINE_STAGES,
+    "workers": OCR_WORKERS
+}
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile; stable for the small samples we collect."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(values):
+    return {
+        "n": len(values),
+        "mean_ms": sum(values) / len(values) if values else 0.0,
+        "p50_ms": percentile(values, 50),
+        "p90_ms": percentile(values, 90),
+        "p99_ms": percentile(values, 99),
+        "max_ms": max(values) if values else 0.0
+    }
+
+
+def make_synthetic_pdf(path, page_count, scanned=False, seed=SYNTHETIC_SEED):
+    """
+    Write a deterministic claim-form-like PDF: headings, numbered form
+    fields, key-value lines and a service table on every page. With
+    `scanned`, each page is rasterized and re-inserted as an image so the
+    document has no text layer.
+    """
+    rng = random.Random(seed)
+    names = ["John Smith", "Maria Garcia", "Wei Chen", "Aisha Khan", "Tom Brown"]
+    providers = ["City Hospital", "Main Clinic", "Care Center", "Health Lab"]
+
+    doc = fitz.open()
+
+    for page_index in range(page_count):
+        page = doc.new_page(width=612, height=792)
+        y = 60
+
+        def write(text, size=10, x=50):
+            nonlocal y
+            page.insert_text((x, y), text, fontsize=size)
+            y += size + 6
+
+        write("CLAIMANT INFORMATION", size=14)
+        write(f"1A. Claimant Full Name: {rng.choice(names)}")
+        write(f"1B. Date of Birth: {rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}/19{rng.randint(50, 99)}")
+        write(f"1C. Policy Number: {rng.randint(10000000, 99999999)}")
+        write("Email: claimant@example.com")
+        write("Gender: Male    Citizenship: United States")
+        y += 10
+
+        write("MEDICAL SERVICES", size=14)
+        write("Date of Service   Provider   Diagnosis   Amount   Currency")
+        for _ in range(rng.randint(4, 10)):
+            write(
+                f"{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}/2024   "
+                f"{rng.choice(providers)}   Code {rng.randint(100, 999)}   "
+                f"{rng.randint(20, 5000)}.00   USD"
+            )
+        y += 10
+
+        write("DECLARATION", size=14)
+        for _ in range(rng.randint(5, 15)):
+            words = rng.sample(
+                ["the", "claimant", "declares", "that", "all", "information",
+                 "provided", "is", "true", "and", "complete", "to", "best",
+                 "of", "knowledge", "page", str(page_index + 1)],
+                10
+            )
+            write(" ".join(words))
+
+    if scanned:
+        scan = fitz.open()
+        for page in doc:
+            pix = page.get_pixmap(dpi=150, colorspace=fitz.csGRAY)
+            scan_page = scan.new_page(width=page.rect.width, height=page.rect.height)
+            scan_page.insert_image(scan_page.rect, pixmap=pix)
+        doc.close()
+        doc = scan
+
+    doc.save(path)
+    doc.close()
+
+
+def collect_inputs(data_dir, synthetic_counts, work_dir):
+    inputs = []
+
+    for path in sorted(glob.glob(os.path.join(data_dir, "*.pdf"))):
+        inputs.append((os.path.basename(path), path))
+
+    for count in synthetic_counts:
+        for scanned in (False, True):
+            name = f"synthetic_{count}p_{'scan' if scanned else 'text'}.pdf"
+            path = os.path.join(work_dir, name)
+            make_synthetic_pdf(path, count, scanned=scanned)
+            inputs.append((name, path))
+
+    return inputs
+
+
+def load_replay_words(blocks_path):
+    """Group the WORD blocks of a saved Blocks JSON (or NDJSON) by page."""
+    pages = {}
+    for block in load_blocks(blocks_path):
+        if block.get("BlockType") == "WORD":
+            pages.setdefault(block.get("Page", 1), []).append(block)
+
+    return pages
+
+
+def tesseract_usable():
+    try:
+        get_engine().image_to_data(np.full((32, 32), 255, dtype=np.uint8))
+    except Exception:
+        return False
+    return True
+
+
+def needs_ocr(pdf_path):
+    with fitz.open(pdf_path) as doc:
+        for page in doc:
+            words = page.get_text("words")
+            if not has_usable_text_layer(page, words, min_words=TEXT_LAYER_MIN_WORDS):
+                return True
+    return False
+
+
+def run_pipeline_once(pdf_path, cache_dir=None, profiler=None, options=None):
+    """Run the pipeline over a PDF with `options` (default PIPELINE_OPTIONS); returns the page count."""
+    cache = OcrCache(cache_dir) if cache_dir else None
+    options = PIPELINE_OPTIONS if options is None else options
+    pages = 0
+    for _, _ in iter_page_blocks(pdf_path, cache=cache, profiler=profiler, **options):
+        pages += 1
+    return pages
+
+
+def measure_peak_memory(fn):
+    """Peak traced allocation (Python + NumPy) of one call, in MiB."""
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / (1024 * 1024)
+
+
+def bench_full_pipeline(pdf_path, repeat, cache_dir=None):
+    run_pipeline_once(pdf_path, cache_dir)  # warm-up (engine, caches, imports)
+
+    elapsed = []
+    stage_times = {}
+    pages = 0
+    buffers_before = page_buffers.stats()
+
+    for _ in range(repeat):
+        profiler = Profiler()
+        start = time.perf_counter()
+        pages = run_pipeline_once(pdf_path, cache_dir, profiler)
+        elapsed.append(time.perf_counter() - start)
+
+        for page in profiler.pages:
+            for name, record in page["stages"].items():
+                stage_times.setdefault(name, []).append(record["wall_ms"])
+
+    best = min(elapsed)
+    buffers = {
+        name: count - buffers_before[name] for name, count in page_buffers.stats().items()
+    }
+
+    return {
+        "pages": pages,
+        "pages_per_sec": pages / best if best else 0.0,
+        "wall_ms": summarize([e * 1000 for e in elapsed]),
+        "stages": {name: summarize(times) for name, times in stage_times.items()},
+        "peak_traced_mb": measure_peak_memory(lambda: run_pipeline_once(pdf_path, cache_dir)),
+        "peak_rss_kb": peak_rss_kb(),
+        # Page buffers newly allocated vs reused over the timed runs
+        "raster_buffers": buffers
+    }
+
+
+def time_stage(profile, name, fn, repeat):
+    result = None
+    for _ in range(repeat):
+        with profile.stage(name):
+            result = fn()
+    return result
+
+
+def bench_stages(pdf_path, repeat, ocr_available):
+    """
+    Time every stage in isolation on every page. Post-processing runs on
+    text-layer words, or on OCR words when Tesseract is usable.
+    """
+    samples = {}
+
+    def record(profile):
+        for name, stage in profile.stages.items():
+            samples.setdefault(name, []).append(stage["wall_ms"] / repeat)
+
+    with fitz.open(pdf_path) as doc:
+        for page in doc:
+            page_num = page.number + 1
+            profile = PageProfile(page_num)
+
+            image = time_stage(profile, "render", lambda: render_page(page, DPI), repeat)
+            time_stage(profile, "preprocess", lambda: preprocess_image(image), repeat)
+
+            words = page.get_text("words")
+            word_blocks = None
+
+            if has_usable_text_layer(page, words, min_words=TEXT_LAYER_MIN_WORDS):
+                word_blocks = time_stage(
+                    profile, "text_layer",
+                    lambda: build_text_layer_word_table(extract_text_layer_words(page), page_num),
+                    repeat
+                )
+            elif ocr_available:
+                binary = preprocess_image(image)
+                word_blocks = time_stage(
+                    profile, "ocr", lambda: extract_word_table(binary, page_num), repeat
+                )
+
+            del image
+
+            if word_blocks is not None:
+                bench_post_processing(profile, page_num, word_blocks, repeat)
+
+            record(profile)
+
+    return {name: summarize(times) for name, times in samples.items()}
+
+
+def bench_post_processing(profile, page_num, word_blocks, repeat):
+    blocks = None
+    for _ in range(repeat):
+        blocks = build_page_blocks(create_block("PAGE", Page=page_num), word_blocks, profile)
+
+    index = time_stage(profile, "block_index", lambda: BlockIndex(blocks), repeat)
+    time_stage(profile, "readable_text", lambda: format_readable_output(index, page_num), repeat)
+    time_stage(profile, "structured_json", lambda: create_structured_json(index, page_num), repeat)
+
+
+def bench_replay(blocks_path, repeat):
+    """Post-processing only, on WORD blocks saved by an earlier run."""
+    pages = load_replay_words(blocks_path)
+    samples = {}
+
+    start = time.perf_counter()
+    for page_num, word_blocks in sorted(pages.items()):
+        profile = PageProfile(page_num)
+        bench_post_processing(profile, page_num, word_blocks, repeat)
+        for name, stage in profile.stages.items():
+            samples.setdefault(name, []).append(stage["wall_ms"] / repeat)
+    elapsed = (time.perf_counter() - start) / repeat
+
+    def replay_all():
+        for page_num, word_blocks in pages.items():
+            build_page_blocks(create_block("PAGE", Page=page_num), word_blocks)
+
+    return {
+        "pages": len(pages),
+        "pages_per_sec": len(pages) / elapsed if elapsed else 0.0,
+        "stages": {name: summarize(times) for name, times in samples.items()},
+        "peak_traced_mb": measure_peak_memory(replay_all)
+    }
+
+
+def flatten_metrics(results):
+    """
+    Map "bench/metric" -> (value, higher_is_better) for the metrics that
+    are compared against the baseline.
+    """
+    metrics = {}
+
+    for bench_name, result in results.items():
+        if "pages_per_sec" in result:
+            metrics[f"{bench_name}/pages_per_sec"] = (result["pages_per_sec"], True)
+        if "peak_traced_mb" in result:
+            metrics[f"{bench_name}/peak_traced_mb"] = (result["peak_traced_mb"], False)
+        for stage_name, stage in result.get("stages", {}).items():
+            metrics[f"{bench_name}/{stage_name}/p50_ms"] = (stage["p50_ms"], False)
+            metrics[f"{bench_name}/{stage_name}/p90_ms"] = (stage["p90_ms"], False)
+
+    return metrics
+
+
+def compare_with_baseline(results, baseline_results, threshold, min_ms=0.5):
+    """
+    Return a list of regressions: metrics that got worse than the
+    baseline by more than `threshold` (a fraction). Latencies under
+    `min_ms` are timer noise and never count as regressions.
+    """
+    current = flatten_metrics(results)
+    previous = flatten_metrics(baseline_results)
+    regressions = []
+
+    for key, (value, higher_is_better) in sorted(current.items()):
+        if key not in previous:
+            continue
+
+        old = previous[key][0]
+        if not old:
+            continue
+
+        if key.endswith("_ms") and max(old, value) < min_ms:
+            continue
+
+        change = (value - old) / old
+        worse = -change if higher_is_better else change
+
+        if worse > threshold:
+            regressions.append({
+                "metric": key,
+                "baseline": old,
+                "current": value,
+                "change": change
+            })
+
+    return regressions
+
+
+def environment_info():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "pymupdf": fitz.VersionBind,
+        "numpy": np.__version__,
+        "ocr_engine": get_engine().name,
+        "dpi": DPI
+    }
+
+
+def run_benchmarks(args):
+    configure_engine(OCR_ENGINE, lang=OCR_LANG)
+
+    ocr_available = tesseract_usable()
+    results = {}
+    skipped = {}
+
+    if args.replay:
+        name = f"replay:{os.path.basename(args.replay)}"
+        results[name] = bench_replay(args.replay, args.repeat)
+        print(f"✅ {name}: {results[name]['pages_per_sec']:.1f} pages/sec")
+
+    if not args.replay_only:
+        with tempfile.TemporaryDirectory() as work_dir:
+            inputs = collect_inputs(args.data_dir, args.synthetic, work_dir)
+
+            for name, path in inputs:
+                if needs_ocr(path) and not ocr_available and not args.cache_dir:
+                    skipped[f"pipeline:{name}"] = "needs OCR, Tesseract unavailable"
+                else:
+                    result = bench_full_pipeline(path, args.repeat, args.cache_dir)
+                    results[f"pipeline:{name}"] = result
+                    print(f"✅ pipeline:{name}: {result['pages_per_sec']:.1f} pages/sec")
+
+                results[f"stages:{name}"] = {
+                    "stages": bench_stages(path, args.repeat, ocr_available)
+                }
+                print(f"✅ stages:{name}")
+
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": environment_info(),
+        "repeat": args.repeat,
+        "pipeline_options": PIPELINE_OPTIONS,
+        "skipped": skipped,
+        "results": results
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--synthetic", type=int, nargs="*", default=list(SYNTHETIC_PAGE_COUNTS),
+                        help="page counts of synthetic documents to generate")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--replay", help="Blocks JSON whose WORD blocks are replayed")
+    parser.add_argument("--replay-only", action="store_true",
+                        help="skip PDF inputs, benchmark --replay only")
+    parser.add_argument("--cache-dir", help="OcrCache directory to replay OCR results from")
+    parser.add_argument("--output", default="output/benchmark.json")
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="allowed slowdown before a metric counts as a regression")
+    parser.add_argument("--save-baseline", help="also write the results here as the new baseline")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run_benchmarks(args)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        report["regressions"] = compare_with_baseline(
+            report["results"], baseline["results"], args.threshold
+        )
+        if baseline.get("pipeline_options") != report["pipeline_options"]:
+            print("⚠️  Baseline was taken with different pipeline options")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Saved benchmark report to: {args.output}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.save_baseline) or ".", exist_ok=True)
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Saved baseline to: {args.save_baseline}")
+
+    for name, reason in report["skipped"].items():
+        print(f"⚠️  Skipped {name}: {reason}")
+
+    regressions = report.get("regressions", [])
+    for r in regressions:
+        print(
+            f"❌ {r['metric']}: {r['baseline']:.3f} -> {r['current']:.3f} "
+            f"({r['change']:+.1%})"
+        )
+
+    if args.baseline and not regressions:
+        print(f"✅ No regressions beyond {args.threshold:.0%}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,4 +4,93 @@ import pytesseract
 pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
 
 OCR_LANG = "eng"
-DPI = 300
\ No newline at end of file
+DPI = 300
+
+# Probe each rendered page at a low resolution and render it at the DPI
+# that brings its text to the size Tesseract reads best (DPI is then only
+# the fallback for pages without measurable text)
+ADAPTIVE_DPI = True
+
+# Render scanned pages straight to single-channel gray (a third of the
+# pixel data of RGB, and no color conversion before binarization)
+RENDER_GRAYSCALE = True
+
+# Read born-digital pages from the PDF text layer instead of running OCR
+USE_TEXT_LAYER = True
+TEXT_LAYER_MIN_WORDS = 20
+
+# OCR plain scans (one full-page image) from the embedded image decoded at
+# its native resolution and colorspace instead of a DPI render
+USE_EMBEDDED_IMAGES = True
+
+# Detect blank / near-blank scans on a low-res probe and skip their OCR
+# (the PAGE block is still emitted, with a Skipped reason)
+SKIP_BLANK_PAGES = True
+
+# OCR only the text regions found on the binarized page (morphology +
+# connected components) instead of the whole raster (tesserocr only; the
+# CLI backend would start a process per region). When pages are processed
+# one at a time, regions are OCR-ed on this many threads, each with its
+# own warm engine
+TEXT_REGIONS = True
+TEXT_REGION_THREADS = 4
+
+# Two-pass OCR: render scanned pages at COARSE_DPI to find text regions
+# and their text height, then re-render only the regions with small print
+# (or poor confidence) at up to DPI (None renders whole pages at DPI)
+COARSE_DPI = None
+
+# Re-OCR lines holding low-confidence words from a higher-resolution
+# render (two binarizations, single-line mode) and keep the better reading.
+# tesserocr only: with the CLI every crop would be a tesseract process
+REFINE_WEAK_WORDS = True
+
+# Detect page orientation (quarter turns) and skew on a shrunk copy and
+# straighten the raster once before OCR; the PAGE block records both
+DESKEW_PAGES = True
+
+# Parallel page OCR: number of worker processes (None = one per CPU)
+OCR_WORKERS = 1
+
+# Staged pipeline (with a single worker): loading, OCR and post-processing
+# of consecutive pages overlap. Threads per stage (each render/OCR thread
+# opens its own copy of the PDF), post-processing processes (0 = one
+# thread) and the most pages held between the stages at once; None
+# processes one page at a time
+PIPELINE_STAGES = {
+    "render_threads": 1,
+    "ocr_threads": 2,
+    "post_processes": 0,
+    "max_in_flight": 4
+}
+
+# Tesseract backend: "tesserocr" keeps a warm in-process engine per thread,
+# "pytesseract" spawns the CLI per page, "auto" prefers tesserocr
+OCR_ENGINE = "auto"
+
+# On-disk cache of per-page OCR results (None disables it)
+OCR_CACHE_DIR = "cache"
+OCR_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Per-page/per-stage timing report written next to the outputs
+PROFILE_PIPELINE = True
+
+# Block ids: "sequential" (deterministic <Type>_<page>_<n>, diffable across
+# runs) or "uuid" (original random <Type>_<hex8>)
+BLOCK_ID_FORMAT = "sequential"
+
+# Block output: "ndjson" streams output_blocks.ndjson page by page (one
+# block per line plus a trailing metadata record); "npz" writes columnar
+# output_blocks.npz (see ocr/block_columns.py) on close, holding the whole
+# document's columns in memory until then; "json" writes the single
+# indented output_blocks.json document at the end
+OUTPUT_FORMAT = "ndjson"
+
+# Local OCR service (service.py): worker threads with warm engines
+# (None = one per CPU) and the cap on queued + running pages before
+# uploads are rejected with 429
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8080
+SERVICE_WORKERS = None
+SERVICE_MAX_IN_FLIGHT_PAGES = 64
+SERVICE_MAX_UPLOAD_BYTES = 100 * 1024 * 1024
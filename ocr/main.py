@@ -1,74 +1,161 @@
 import json
 import os
-from config import DPI
-
-from ocr.pdf_loader import pdf_to_images
-from ocr.image_preprocessor import preprocess_image
-from ocr.word_blocks import extract_word_blocks
-from ocr.line_blocks import group_words_into_lines
-from ocr.section_blocks import build_section_blocks
-from ocr.table_blocks import extract_tables, build_table_blocks
-from ocr.block_factory import create_block
-from ocr.readable_formatter import save_readable_output
-
-# ✅ NEW IMPORT (this is the missing piece)
-from ocr.form_parser import build_form_blocks
+from config import (
+    DPI, OCR_LANG, OCR_ENGINE, USE_TEXT_LAYER, TEXT_LAYER_MIN_WORDS, SKIP_BLANK_PAGES,
+    USE_EMBEDDED_IMAGES, RENDER_GRAYSCALE, ADAPTIVE_DPI,
+    TEXT_REGIONS, TEXT_REGION_THREADS, COARSE_DPI, REFINE_WEAK_WORDS, DESKEW_PAGES,
+    PIPELINE_STAGES,
+    OCR_WORKERS, OCR_CACHE_DIR, OCR_CACHE_MAX_BYTES, PROFILE_PIPELINE, BLOCK_ID_FORMAT,
+    OUTPUT_FORMAT
+)
+
+from ocr.pipeline import iter_page_blocks
+from ocr.block_factory import set_id_format
+from ocr.tesseract_engine import configure_engine
+from ocr.ocr_cache import OcrCache
+from ocr.instrumentation import Profiler, timed
+from ocr.raster_buffers import page_buffers
+from ocr.block_stream import NdjsonBlockWriter, open_blocks
+from ocr.block_columns import ColumnarBlockWriter
+from ocr.readable_formatter import save_readable_output, save_readable_pages
 
 
 PDF_PATH = "data/main_test_file.pdf"
 
+# Output formats written page by page while the pipeline runs
+BLOCK_WRITERS = {
+    "ndjson": NdjsonBlockWriter,
+    "npz": ColumnarBlockWriter
+}
 
-def run_ocr(pdf_path):
-    pages = pdf_to_images(pdf_path, dpi=DPI)
-    all_blocks = []
-
-    for page in pages:
-        page_num = page["page_number"]
-        image = preprocess_image(page["image"])
-
-        page_block = create_block("PAGE", Page=page_num)
-        all_blocks.append(page_block)
 
-        word_blocks = extract_word_blocks(image, page_num)
-        line_blocks = group_words_into_lines(word_blocks)
+def run_ocr(pdf_path, on_page=None, workers=OCR_WORKERS, output_format=OUTPUT_FORMAT):
+    """
+    Pages are rendered, OCR-ed and post-processed in overlapping stages
+    (PIPELINE_STAGES; or across `workers` processes); `on_page(page_num,
+    blocks)` is called in page order as soon as each page's blocks exist.
 
-        # ✅ NEW: Build form fields + key-value pairs + checkboxes
-        form_blocks = build_form_blocks(line_blocks, word_blocks)
+    With output_format="ndjson" blocks are streamed to
+    output/output_blocks.ndjson as pages finish and the returned result
+    points at that file instead of holding every block. "npz" writes
+    columnar output_blocks.npz (see block_columns) when the run ends,
+    holding the document's packed columns until then; "json" keeps the
+    single indented output_blocks.json written at the end.
+    """
+    configure_engine(OCR_ENGINE, lang=OCR_LANG)
+    set_id_format(BLOCK_ID_FORMAT)
 
-        section_blocks = build_section_blocks(line_blocks)
+    cache = None
+    if OCR_CACHE_DIR:
+        cache = OcrCache(OCR_CACHE_DIR, max_bytes=OCR_CACHE_MAX_BYTES)
 
-        table_lines = extract_tables(line_blocks)
-        table_blocks = build_table_blocks(table_lines)
+    profiler = Profiler() if PROFILE_PIPELINE else None
 
-        # ✅ Best order for readable_formatter output
-        all_blocks.extend(section_blocks)
-        all_blocks.extend(form_blocks)   # ✅ IMPORTANT
-        all_blocks.extend(table_blocks)
-        all_blocks.extend(line_blocks)
-        all_blocks.extend(word_blocks)
-
-    result = {
-        "DocumentMetadata": {
-            "Pages": len(pages)
-        },
-        "Blocks": all_blocks
-    }
-
-    # Save JSON output
     output_dir = "output"
     os.makedirs(output_dir, exist_ok=True)
 
-    output_path = os.path.join(output_dir, "output_blocks.json")
-    with open(output_path, "w") as f:
-        json.dump(result, f, indent=4)
+    # Readable outputs keep their output_blocks_*.txt/json names either way
+    json_path = os.path.join(output_dir, "output_blocks.json")
+    streaming = output_format in BLOCK_WRITERS
 
-    print(f"✅ Saved JSON to: {output_path}")
+    if streaming:
+        output_path = os.path.join(output_dir, f"output_blocks.{output_format}")
+        writer = BLOCK_WRITERS[output_format](output_path)
+    else:
+        output_path = json_path
+        writer = None
+
+    all_blocks = []
+    page_count = 0
+
+    pages = iter_page_blocks(
+        pdf_path,
+        dpi=DPI,
+        use_text_layer=USE_TEXT_LAYER,
+        text_layer_min_words=TEXT_LAYER_MIN_WORDS,
+        skip_blank_pages=SKIP_BLANK_PAGES,
+        embedded_images=USE_EMBEDDED_IMAGES,
+        grayscale=RENDER_GRAYSCALE,
+        text_regions=TEXT_REGIONS,
+        region_threads=TEXT_REGION_THREADS,
+        coarse_dpi=COARSE_DPI,
+        refine_words=REFINE_WEAK_WORDS,
+        deskew=DESKEW_PAGES,
+        adaptive_dpi=ADAPTIVE_DPI,
+        stages=PIPELINE_STAGES,
+        workers=workers,
+        cache=cache,
+        profiler=profiler
+    )
+
+    try:
+        for page_num, page_blocks in pages:
+            page_count += 1
+
+            if streaming:
+                with timed(profiler, "write_blocks"):
+                    writer.write_page(page_num, page_blocks)
+            else:
+                all_blocks.extend(page_blocks)
+
+            print(f"✅ Processed page {page_num} ({len(page_blocks)} blocks)")
+
+            if on_page is not None:
+                on_page(page_num, page_blocks)
+    except BaseException:
+        # No trailer: a partial file must not look like a finished document
+        if streaming:
+            writer.abort()
+        raise
+
+    if streaming:
+        writer.close(Source=pdf_path)
+
+    if streaming:
+        result = {
+            "DocumentMetadata": {
+                "Pages": page_count
+            },
+            "Output": output_path
+        }
+    else:
+        result = {
+            "DocumentMetadata": {
+                "Pages": page_count
+            },
+            "Blocks": all_blocks
+        }
+
+        # Save JSON output
+        with timed(profiler, "write_json"):
+            with open(output_path, "w") as f:
+                json.dump(result, f, indent=4)
+
+    print(f"✅ Saved blocks to: {output_path}")
+
+    if cache is not None:
+        stats = cache.stats()
+        print(f"✅ OCR cache: {stats['hits']} hits, {stats['misses']} misses")
 
     # ✅ Save readable outputs (TXT + structured JSON)
-    save_readable_output(all_blocks, output_path)
+    with timed(profiler, "readable_output"):
+        if streaming:
+            save_readable_pages(open_blocks(output_path).iter_pages(), json_path)
+        else:
+            save_readable_output(all_blocks, json_path)
+
+    if profiler is not None:
+        profile_path = json_path.replace(".json", "_profile.json")
+        profiler.save(
+            profile_path,
+            source=pdf_path,
+            ocr_cache=cache.stats() if cache is not None else None,
+            raster_buffers=page_buffers.stats()
+        )
+        print(f"✅ Saved pipeline profile to: {profile_path}")
 
     return result
 
 
 if __name__ == "__main__":
-    run_ocr(PDF_PATH)
\ No newline at end of file
+    run_ocr(PDF_PATH)
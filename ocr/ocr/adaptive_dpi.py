@@ -0,0 +1,75 @@
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+
+from ocr.text_regions import glyph_heights
+
+# Low-resolution grayscale probe the page's glyph height is measured on;
+# ~10pt body text measures ~8 px here
+PROBE_DPI = 100
+
+# Glyph height (px) Tesseract reads reliably, as in coarse_to_fine:
+# pages are rendered at the DPI that brings their text to this height
+TARGET_GLYPH_HEIGHT = 22
+
+# Chosen DPIs are rounded up to this step and kept in this range
+DPI_STEP = 25
+MIN_DPI = 150
+MAX_DPI = 600
+
+# Pages with fewer glyphs than this, or whose glyph heights spread wider
+# than this (upper / lower quartile; photos and noise, not a body of
+# text), are rendered at the configured DPI
+MIN_GLYPHS = 30
+MAX_SPREAD = 1.75
+
+
+def adaptive_dpi_settings():
+    """Everything that changes the chosen page DPI."""
+    return {
+        "probe_dpi": PROBE_DPI,
+        "target_glyph_height": TARGET_GLYPH_HEIGHT,
+        "dpi_step": DPI_STEP,
+        "min_dpi": MIN_DPI,
+        "max_dpi": MAX_DPI,
+        "min_glyphs": MIN_GLYPHS,
+        "max_spread": MAX_SPREAD
+    }
+
+
+def probe_glyph_height(page):
+    """
+    Typical glyph height (px at PROBE_DPI) of a page: the mean of the
+    interquartile glyph heights, which resolves sub-pixel differences the
+    median of such small integers cannot. 0.0 when the page shows too
+    little text to tell.
+    """
+    pix = page.get_pixmap(dpi=PROBE_DPI, colorspace=fitz.csGRAY)
+    gray = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)
+    gray = gray[:, :pix.width]
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+    heights = glyph_heights(binary)
+    if len(heights) < MIN_GLYPHS:
+        return 0.0
+
+    low, high = np.percentile(heights, [25, 75])
+    if high > low * MAX_SPREAD:
+        return 0.0
+    return float(heights[(heights >= low) & (heights <= high)].mean())
+
+
+def choose_page_dpi(page, default_dpi=300):
+    """
+    Render DPI that brings the page's text to TARGET_GLYPH_HEIGHT,
+    rounded up to DPI_STEP within [MIN_DPI, MAX_DPI]: large type is
+    rendered coarser than `default_dpi`, fine print finer. Pages without
+    measurable text keep `default_dpi`.
+    """
+    height = probe_glyph_height(page)
+    if height <= 0:
+        return default_dpi
+
+    dpi = PROBE_DPI * TARGET_GLYPH_HEIGHT / height
+    dpi = -(-dpi // DPI_STEP) * DPI_STEP
+    return int(min(MAX_DPI, max(MIN_DPI, dpi)))
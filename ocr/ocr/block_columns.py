@@ -0,0 +1,406 @@
+import json
+import struct
+import zipfile
+
+import numpy as np
+
+# Fields stored in typed columns when their value has the expected
+# shape; anything else (form/table extras, unusual values) goes to a
+# per-row JSON "extra" string
+BOX_KEYS = ("Left", "Top", "Width", "Height")
+LAYOUT_KEYS = ("Block", "Paragraph", "Line")
+
+FORMAT_VERSION = 1
+
+
+def _is_float(value):
+    return type(value) is float
+
+
+def _is_int(value):
+    return type(value) is int
+
+
+def _typed(key, value):
+    """Whether `value` fits the typed column for `key`."""
+    if key in ("Id", "BlockType", "Text"):
+        return isinstance(value, str)
+    if key == "Page":
+        return _is_int(value)
+    if key == "Confidence":
+        return _is_float(value)
+    if key == "Geometry":
+        return (
+            isinstance(value, dict)
+            and list(value) == ["BoundingBox"]
+            and isinstance(value["BoundingBox"], dict)
+            and tuple(value["BoundingBox"]) == BOX_KEYS
+            and all(_is_float(v) for v in value["BoundingBox"].values())
+        )
+    if key == "Layout":
+        return (
+            isinstance(value, dict)
+            and tuple(value) == LAYOUT_KEYS
+            and all(_is_int(v) for v in value.values())
+        )
+    if key == "Relationships":
+        return isinstance(value, list) and all(
+            isinstance(r, dict)
+            and list(r) == ["Type", "Ids"]
+            and isinstance(r["Type"], str)
+            and isinstance(r["Ids"], list)
+            and all(isinstance(i, str) for i in r["Ids"])
+            for r in value
+        )
+    return False
+
+
+# Per-block and per-relationship columns: dtype and row width (0 for
+# scalars). Rows are packed into NumPy chunks page by page
+COLUMNS = {
+    "id": (np.int32, 0),
+    "block_type": (np.int16, 0),
+    "shape": (np.int32, 0),
+    "page": (np.int32, 0),
+    "text": (np.int32, 0),
+    "confidence": (np.float64, 0),
+    "bbox": (np.float64, 4),
+    "layout": (np.int32, 3),
+    "extra": (np.int32, 0),
+    "rel_offsets": (np.int64, 0),
+    "rel_type": (np.int16, 0),
+    "rel_target_offsets": (np.int64, 0),
+    "rel_targets": (np.int64, 0)
+}
+
+
+class ColumnarBlockWriter:
+    """
+    Writes blocks to an uncompressed .npz of typed columns (one row per
+    block, in output order) plus a UTF-8 string table. Relationships are
+    stored as integer offsets: per block a slice of relationship groups,
+    per group a slice of target rows. Same write_page/close interface as
+    NdjsonBlockWriter.
+
+    Unlike the NDJSON output, the file is only written by close(): the
+    string table and the id -> row resolution of relationships need the
+    whole document. Until then every page's rows are held, packed into
+    NumPy chunks (not the pages' dicts), so memory still grows with the
+    document. abort() leaves no file behind.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+        self._strings = {}
+        self._type_codes = {}
+        self._shape_codes = {}
+        self._relationship_codes = {}
+
+        # Rows of the current page, then packed chunks per column
+        self._rows = {name: [] for name in COLUMNS}
+        self._chunks = {name: [] for name in COLUMNS}
+        self._chunks["rel_offsets"].append(np.zeros(1, dtype=np.int64))
+        self._chunks["rel_target_offsets"].append(np.zeros(1, dtype=np.int64))
+        self._relationship_count = 0
+        self._target_count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._rows is None:
+            return
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+    def _string(self, text):
+        index = self._strings.get(text)
+        if index is None:
+            index = self._strings[text] = len(self._strings)
+        return index
+
+    @staticmethod
+    def _code(table, value):
+        code = table.get(value)
+        if code is None:
+            code = table[value] = len(table)
+        return code
+
+    def write_page(self, page_num, blocks):
+        for block in blocks:
+            self._write_block(block)
+        self._pack()
+
+    def _pack(self):
+        """Move the rows written since the last call into NumPy chunks."""
+        for name, (dtype, width) in COLUMNS.items():
+            values = self._rows[name]
+            if not values:
+                continue
+            array = np.asarray(values, dtype=dtype)
+            self._chunks[name].append(array.reshape(-1, width) if width else array)
+            values.clear()
+
+    def _column(self, name):
+        dtype, width = COLUMNS[name]
+        chunks = self._chunks[name]
+        if not chunks:
+            return np.zeros((0, width) if width else 0, dtype=dtype)
+        return np.concatenate(chunks)
+
+    def _write_block(self, block):
+        rows = self._rows
+        shape = []
+        extra = {}
+        typed = {}
+
+        for key, value in block.items():
+            if _typed(key, value):
+                typed[key] = value
+                shape.append((key, 1))
+            else:
+                extra[key] = value
+                shape.append((key, 0))
+
+        rows["id"].append(self._string(typed["Id"]) if "Id" in typed else -1)
+        rows["block_type"].append(
+            self._code(self._type_codes, typed["BlockType"]) if "BlockType" in typed else -1
+        )
+        rows["shape"].append(self._code(self._shape_codes, tuple(shape)))
+        rows["page"].append(typed.get("Page", -1))
+        rows["text"].append(self._string(typed["Text"]) if "Text" in typed else -1)
+        rows["confidence"].append(typed.get("Confidence", np.nan))
+
+        if "Geometry" in typed:
+            rows["bbox"].append(tuple(typed["Geometry"]["BoundingBox"].values()))
+        else:
+            rows["bbox"].append((np.nan,) * 4)
+
+        if "Layout" in typed:
+            rows["layout"].append(tuple(typed["Layout"].values()))
+        else:
+            rows["layout"].append((-1,) * 3)
+
+        rows["extra"].append(self._string(json.dumps(extra)) if extra else -1)
+
+        for relationship in typed.get("Relationships", []):
+            rows["rel_type"].append(self._code(self._relationship_codes, relationship["Type"]))
+            # Target ids are resolved to rows in close(), once every
+            # block (children can follow their parent) has been written
+            rows["rel_targets"].extend(self._string(i) for i in relationship["Ids"])
+            self._target_count += len(relationship["Ids"])
+            rows["rel_target_offsets"].append(self._target_count)
+            self._relationship_count += 1
+        rows["rel_offsets"].append(self._relationship_count)
+
+    def close(self, **metadata):
+        self._pack()
+        columns = {name: self._column(name) for name in COLUMNS}
+        ids = columns["id"].astype(np.int64)
+        pages = columns["page"]
+
+        # string index -> row, so relationship targets become row numbers;
+        # ids missing from the document are kept as -(string index) - 1
+        id_rows = np.full(len(self._strings), -1, dtype=np.int64)
+        known = ids >= 0
+        id_rows[ids[known]] = np.flatnonzero(known)
+
+        targets = columns["rel_targets"]
+        target_rows = id_rows[targets] if len(targets) else targets
+        dangling = target_rows < 0
+        target_rows[dangling] = -targets[dangling] - 1
+        columns["rel_targets"] = target_rows
+
+        encoded = [s.encode("utf-8") for s in self._strings]
+        string_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(s) for s in encoded], out=string_offsets[1:])
+
+        header = {
+            "FormatVersion": FORMAT_VERSION,
+            "Pages": len(np.unique(pages[pages >= 0])),
+            **metadata,
+            "BlockTypes": list(self._type_codes),
+            "Shapes": [list(map(list, shape)) for shape in self._shape_codes],
+            "RelationshipTypes": list(self._relationship_codes)
+        }
+
+        np.savez(
+            self.path,
+            metadata=np.frombuffer(json.dumps(header).encode("utf-8"), dtype=np.uint8),
+            strings_data=np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            strings_offsets=string_offsets,
+            **columns
+        )
+
+        self._rows = self._chunks = None
+
+    def abort(self):
+        """Drop the buffered columns without writing the file."""
+        self._rows = self._chunks = None
+
+
+def _mmap_npz(path):
+    """
+    Memory-map every member of an uncompressed .npz; np.load() would
+    read each member into memory on access.
+    """
+    arrays = {}
+
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as f:
+        for info in archive.infolist():
+            name = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+
+            if info.compress_type != zipfile.ZIP_STORED:
+                arrays[name] = np.load(archive.open(info))
+                continue
+
+            # Local header: 30 fixed bytes, then file name and extra field
+            f.seek(info.header_offset + 26)
+            name_length, extra_length = struct.unpack("<HH", f.read(4))
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            elif version == (2, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            else:
+                arrays[name] = np.load(archive.open(info))
+                continue
+
+            if not np.prod(shape, dtype=np.int64):
+                arrays[name] = np.empty(shape, dtype=dtype)
+                continue
+
+            arrays[name] = np.memmap(
+                path, dtype=dtype, mode="r", offset=f.tell(), shape=shape,
+                order="F" if fortran_order else "C"
+            )
+
+    return arrays
+
+
+class ColumnarBlockReader:
+    """
+    Lazy reader for ColumnarBlockWriter output. Columns are memory-mapped
+    NumPy arrays (`reader.page`, `reader.confidence`, `reader.bbox`, ...)
+    for vectorized analytics; block dicts are only materialized on demand
+    and come back identical to what was written.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._arrays = _mmap_npz(path)
+
+        self.metadata = json.loads(bytes(self._arrays["metadata"]).decode("utf-8"))
+        self.block_types = self.metadata["BlockTypes"]
+        self.relationship_types = self.metadata["RelationshipTypes"]
+        self._shapes = [[tuple(k) for k in shape] for shape in self.metadata["Shapes"]]
+
+        for name in (
+            "id", "block_type", "shape", "page", "text", "confidence", "bbox",
+            "layout", "extra", "rel_offsets", "rel_type", "rel_target_offsets",
+            "rel_targets"
+        ):
+            setattr(self, name, self._arrays[name])
+
+        self._strings_data = self._arrays["strings_data"]
+        self._strings_offsets = self._arrays["strings_offsets"]
+
+    def __len__(self):
+        return len(self.id)
+
+    @property
+    def pages(self):
+        return np.unique(self.page[self.page >= 0]).tolist()
+
+    def string(self, index):
+        start, end = self._strings_offsets[index:index + 2].tolist()
+        return bytes(self._strings_data[start:end]).decode("utf-8")
+
+    def rows_of_type(self, block_type, page=None):
+        """Row numbers of one BlockType (optionally on one page), in output order."""
+        if block_type not in self.block_types:
+            return np.empty(0, dtype=np.int64)
+
+        mask = self.block_type == self.block_types.index(block_type)
+        if page is not None:
+            mask &= self.page == page
+        return np.flatnonzero(mask)
+
+    def page_rows(self, page_num):
+        return np.flatnonzero(self.page == page_num)
+
+    def child_rows(self, row):
+        """Target rows of a block's CHILD relationships (dangling ids skipped)."""
+        if "CHILD" not in self.relationship_types:
+            return np.empty(0, dtype=np.int64)
+        child = self.relationship_types.index("CHILD")
+
+        start, end = self.rel_offsets[row:row + 2].tolist()
+        rows = []
+        for group in range(start, end):
+            if self.rel_type[group] == child:
+                lo, hi = self.rel_target_offsets[group:group + 2].tolist()
+                targets = self.rel_targets[lo:hi]
+                rows.append(targets[targets >= 0])
+
+        return np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+
+    def _target_id(self, target):
+        target = int(target)
+        if target >= 0:
+            return self.string(int(self.id[target]))
+        return self.string(-target - 1)
+
+    def block(self, row):
+        """Materialize one block dict."""
+        extra = None
+        block = {}
+
+        for key, typed in self._shapes[self.shape[row]]:
+            if not typed:
+                if extra is None:
+                    extra = json.loads(self.string(int(self.extra[row])))
+                block[key] = extra[key]
+            elif key == "Id":
+                block[key] = self.string(int(self.id[row]))
+            elif key == "BlockType":
+                block[key] = self.block_types[self.block_type[row]]
+            elif key == "Page":
+                block[key] = int(self.page[row])
+            elif key == "Text":
+                block[key] = self.string(int(self.text[row]))
+            elif key == "Confidence":
+                block[key] = float(self.confidence[row])
+            elif key == "Geometry":
+                block[key] = {"BoundingBox": dict(zip(BOX_KEYS, self.bbox[row].tolist()))}
+            elif key == "Layout":
+                block[key] = dict(zip(LAYOUT_KEYS, self.layout[row].tolist()))
+            elif key == "Relationships":
+                start, end = self.rel_offsets[row:row + 2].tolist()
+                relationships = []
+                for group in range(start, end):
+                    lo, hi = self.rel_target_offsets[group:group + 2].tolist()
+                    relationships.append({
+                        "Type": self.relationship_types[self.rel_type[group]],
+                        "Ids": [self._target_id(t) for t in self.rel_targets[lo:hi]]
+                    })
+                block[key] = relationships
+
+        return block
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self.block(row)
+
+    def read_page(self, page_num):
+        return [self.block(row) for row in self.page_rows(page_num).tolist()]
+
+    def iter_pages(self):
+        """(page_num, blocks) for each page, in page order."""
+        for page_num in self.pages:
+            yield page_num, self.read_page(page_num)
@@ -1,7 +1,80 @@
 import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# "sequential": deterministic <Type>_<page>_<ordinal> ids inside a
+# page_id_scope; "uuid": the original random <Type>_<hex8> ids
+ID_FORMATS = ("sequential", "uuid")
+
+_settings = {"id_format": "sequential"}
+_page_ids = ContextVar("page_ids", default=None)
+
+
+class PageIdAllocator:
+    """Hands out `<Type>_<page>_<n>` ids, counting per block type."""
+
+    def __init__(self, page_num):
+        self.page_num = page_num
+        self.counters = {}
+
+    def allocate(self, prefix):
+        ordinal = self.counters.get(prefix, 0) + 1
+        self.counters[prefix] = ordinal
+        return f"{prefix}_{self.page_num}_{ordinal}"
+
+    def allocate_many(self, prefix, count):
+        start = self.counters.get(prefix, 0) + 1
+        self.counters[prefix] = start + count - 1
+        return [f"{prefix}_{self.page_num}_{n}" for n in range(start, start + count)]
+
+
+def set_id_format(id_format):
+    if id_format not in ID_FORMATS:
+        raise ValueError(f"Unknown block id format: {id_format}")
+    _settings["id_format"] = id_format
+
+
+def get_id_format():
+    return _settings["id_format"]
+
+
+@contextmanager
+def page_id_scope(page_num, allocator=None):
+    """
+    Blocks created inside the scope get deterministic ids for `page_num`,
+    so the same document always yields the same ids, whichever process
+    or thread handles the page. Yields the scope's PageIdAllocator; pass
+    it back as `allocator` to continue a page's numbering in a later
+    scope (e.g. when its blocks are finished on another thread or
+    process). No-op (yielding None) in "uuid" mode.
+    """
+    if _settings["id_format"] != "sequential":
+        yield None
+        return
+
+    if allocator is None:
+        allocator = PageIdAllocator(page_num)
+
+    token = _page_ids.set(allocator)
+    try:
+        yield allocator
+    finally:
+        _page_ids.reset(token)
+
 
 def new_id(prefix):
-    return f"{prefix}_{uuid.uuid4().hex[:8]}"
+    allocator = _page_ids.get()
+    if allocator is None:
+        return f"{prefix}_{uuid.uuid4().hex[:8]}"
+    return allocator.allocate(prefix)
+
+
+def new_ids(prefix, count):
+    allocator = _page_ids.get()
+    if allocator is None:
+        return [new_id(prefix) for _ in range(count)]
+    return allocator.allocate_many(prefix, count)
+
 
 def create_block(block_type, **kwargs):
     block = {
@@ -0,0 +1,103 @@
+import numpy as np
+
+
+class BlockIndex:
+    """
+    Lookup tables over a document's blocks.
+
+    Blocks are indexed by Id and by (Page, BlockType), so formatters can
+    fetch "all TABLE blocks on page 3" or "the CELL children of this
+    table" without rescanning the whole block list. All results keep the
+    original document order.
+
+    CHILD relationships are resolved once into an integer table (CSR
+    style: block row -> slice of child rows), so child lookups are array
+    slices rather than per-call string lookups.
+    """
+
+    def __init__(self, blocks):
+        self.blocks = blocks
+        self._by_id = {}
+        self._rows = {}
+        self._by_type = {}
+        self._by_page_type = {}
+
+        pages = set()
+
+        for row, block in enumerate(blocks):
+            block_type = block.get("BlockType")
+            page = block.get("Page")
+
+            self._by_id[block["Id"]] = block
+            self._rows[block["Id"]] = row
+            self._by_type.setdefault(block_type, []).append(block)
+            self._by_page_type.setdefault((page, block_type), []).append(block)
+
+            if "Page" in block:
+                pages.add(page)
+
+        self.pages = sorted(pages)
+        self.child_offsets, self.child_rows = self._build_child_table()
+
+    def _build_child_table(self):
+        # Children may appear after their parent (PARAGRAPH before LINE),
+        # so resolve only once every Id has a row
+        offsets = np.zeros(len(self.blocks) + 1, dtype=np.int64)
+        rows = []
+
+        for row, block in enumerate(self.blocks):
+            for child_id in self.child_ids(block):
+                child_row = self._rows.get(child_id)
+                if child_row is not None:
+                    rows.append(child_row)
+            offsets[row + 1] = len(rows)
+
+        return offsets, np.asarray(rows, dtype=np.int64)
+
+    @classmethod
+    def of(cls, blocks):
+        """Return `blocks` if it is already an index, else index it."""
+        return blocks if isinstance(blocks, cls) else cls(blocks)
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def get(self, block_id):
+        return self._by_id.get(block_id)
+
+    def row(self, block_id):
+        """Position of a block in `blocks`, or None."""
+        return self._rows.get(block_id)
+
+    def child_rows_of(self, row):
+        return self.child_rows[self.child_offsets[row]:self.child_offsets[row + 1]]
+
+    def of_type(self, block_type, page=None):
+        if page is None:
+            return self._by_type.get(block_type, [])
+        return self._by_page_type.get((page, block_type), [])
+
+    def child_ids(self, block):
+        ids = []
+        for relationship in block.get("Relationships") or []:
+            if relationship.get("Type", "CHILD") == "CHILD":
+                ids.extend(relationship.get("Ids", []))
+        return ids
+
+    def children(self, block, block_type=None):
+        """Resolve a block's CHILD ids, optionally keeping one BlockType."""
+        row = self._rows.get(block.get("Id"))
+
+        # Blocks from outside the index still resolve through the Id map
+        if row is None or self.blocks[row] is not block:
+            children = [
+                self._by_id[child_id]
+                for child_id in self.child_ids(block)
+                if child_id in self._by_id
+            ]
+        else:
+            children = [self.blocks[r] for r in self.child_rows_of(row).tolist()]
+
+        if block_type is not None:
+            children = [c for c in children if c.get("BlockType") == block_type]
+        return children
@@ -0,0 +1,172 @@
+import json
+import os
+
+from ocr.block_columns import ColumnarBlockReader
+
+
+class NdjsonBlockWriter:
+    """
+    Writes blocks as newline-delimited JSON, one block per line, a page
+    at a time, so output exists while the document is still running and
+    no document-sized list has to be held for the final dump.
+
+    close() appends one trailing {"DocumentMetadata": ...} record holding
+    the page count and a byte-offset index of each page's blocks, which
+    NdjsonBlockReader uses to seek straight to a page. abort() closes the
+    file without it, so an interrupted run reads as cut short.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "wb")
+        self._offset = 0
+        self._pages = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._file.closed:
+            return
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+    def write_page(self, page_num, blocks):
+        start = self._offset
+        data = "".join(json.dumps(block) + "\n" for block in blocks).encode("utf-8")
+
+        self._file.write(data)
+        self._file.flush()
+
+        self._offset += len(data)
+        self._pages[page_num] = {"Offset": start, "Blocks": len(blocks)}
+
+    def close(self, **metadata):
+        record = {
+            "DocumentMetadata": {
+                "Pages": len(self._pages),
+                **metadata,
+                "PageIndex": {str(page): entry for page, entry in self._pages.items()}
+            }
+        }
+        self._file.write((json.dumps(record) + "\n").encode("utf-8"))
+        self._file.close()
+
+    def abort(self):
+        """Close the file without the metadata record: the document did not finish."""
+        self._file.close()
+
+
+class NdjsonBlockReader:
+    """
+    Reads NdjsonBlockWriter output without loading the whole file.
+    Iterating yields blocks in file order; read_page() seeks via the
+    trailing page index. Files cut short (no metadata record, e.g. an
+    interrupted run) are indexed with one scan instead.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.metadata = self._read_metadata()
+
+        if self.metadata is not None:
+            self._page_index = {
+                int(page): entry
+                for page, entry in self.metadata.get("PageIndex", {}).items()
+            }
+        else:
+            self._page_index = self._scan_page_index()
+
+    def _read_metadata(self):
+        with open(self.path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            end = f.tell()
+
+            # Walk back from the end to the start of the last line
+            chunk_size = 4096
+            tail = b""
+            position = end
+            while position > 0:
+                read_size = min(chunk_size, position)
+                position -= read_size
+                f.seek(position)
+                tail = f.read(read_size) + tail
+                if tail.rstrip(b"\n").count(b"\n") >= 1:
+                    break
+
+        lines = tail.rstrip(b"\n").split(b"\n")
+        if not lines[-1]:
+            return None
+
+        try:
+            record = json.loads(lines[-1])
+        except ValueError:
+            return None
+
+        return record.get("DocumentMetadata") if isinstance(record, dict) else None
+
+    def _scan_page_index(self):
+        index = {}
+        with open(self.path, "rb") as f:
+            offset = 0
+            for line in f:
+                try:
+                    block = json.loads(line)
+                except ValueError:
+                    # Partially written last line
+                    break
+
+                if "DocumentMetadata" not in block:
+                    entry = index.setdefault(block.get("Page", 1), {"Offset": offset, "Blocks": 0})
+                    entry["Blocks"] += 1
+
+                offset += len(line)
+        return index
+
+    @property
+    def pages(self):
+        return sorted(self._page_index)
+
+    def __iter__(self):
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    block = json.loads(line)
+                except ValueError:
+                    break
+                if "DocumentMetadata" in block:
+                    continue
+                yield block
+
+    def read_page(self, page_num):
+        """Blocks of one page, in output order ([] if the page is absent)."""
+        entry = self._page_index.get(page_num)
+        if entry is None:
+            return []
+
+        with open(self.path, "rb") as f:
+            f.seek(entry["Offset"])
+            return [json.loads(f.readline()) for _ in range(entry["Blocks"])]
+
+    def iter_pages(self):
+        """(page_num, blocks) for each page, in page order."""
+        for page_num in self.pages:
+            yield page_num, self.read_page(page_num)
+
+
+def open_blocks(path):
+    """Page-seekable reader for a streamed output file (.ndjson or .npz)."""
+    if path.endswith(".npz"):
+        return ColumnarBlockReader(path)
+    return NdjsonBlockReader(path)
+
+
+def load_blocks(path):
+    """All blocks of an output file: NDJSON, columnar .npz or the indented JSON document."""
+    if path.endswith((".ndjson", ".npz")):
+        return list(open_blocks(path))
+
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("Blocks", [])
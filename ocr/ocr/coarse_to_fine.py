@@ -0,0 +1,142 @@
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+
+from ocr.pdf_loader import render_page
+from ocr.image_preprocessor import preprocess_image
+from ocr.text_regions import find_text_regions, glyph_height, region_ink_share, MIN_INK_SHARE
+from ocr.word_blocks import ocr_crops, merge_region_word_table, mean_confidence
+from ocr.instrumentation import timed
+
+# Median glyph height (px) Tesseract reads reliably; ~10pt body text at
+# 300 DPI. Regions are re-rendered at the DPI that brings their text to
+# this height
+TARGET_GLYPH_HEIGHT = 22
+
+# Re-render DPIs are rounded up to this step (fewer distinct rasters)
+DPI_STEP = 25
+
+# Regions OCR-ed below the full DPI whose mean word confidence stays under
+# this are re-rendered at the full DPI and OCR-ed again
+MIN_CONFIDENCE = 60
+
+
+def coarse_settings(coarse_dpi, fine_dpi):
+    """Everything that changes two-pass OCR output (used in OCR cache keys)."""
+    return {
+        "coarse_dpi": coarse_dpi,
+        "fine_dpi": fine_dpi,
+        "target_glyph_height": TARGET_GLYPH_HEIGHT,
+        "dpi_step": DPI_STEP,
+        "min_confidence": MIN_CONFIDENCE
+    }
+
+
+def region_dpi(height, coarse_dpi, fine_dpi):
+    """
+    DPI to OCR a region at, given its median glyph height (px) on the
+    coarse raster: the coarse DPI itself for large print, at most
+    `fine_dpi` for fine print (or when no glyphs were measured).
+    """
+    if height <= 0:
+        return fine_dpi
+
+    dpi = coarse_dpi * TARGET_GLYPH_HEIGHT / height
+    if dpi <= coarse_dpi:
+        return coarse_dpi
+
+    dpi = -(-dpi // DPI_STEP) * DPI_STEP
+    return int(min(fine_dpi, dpi))
+
+
+def _render_region(pdf_page, region, coarse_dpi, dpi):
+    """Re-render one coarse-raster region at `dpi` and binarize it like the page."""
+    x0, y0, x1, y1, inverted = region
+    clip = fitz.Rect(x0, y0, x1, y1) * (72 / coarse_dpi)
+
+    crop = preprocess_image(render_page(pdf_page, dpi, clip=clip))
+    if inverted:
+        crop = cv2.bitwise_not(crop)
+    return crop
+
+
+def _coarse_crop(binary, region):
+    x0, y0, x1, y1, inverted = region
+    crop = np.ascontiguousarray(binary[y0:y1, x0:x1])
+    if inverted:
+        crop = cv2.bitwise_not(crop)
+    return crop
+
+
+def coarse_to_fine_word_table(page, engine=None, profile=None, executor=None):
+    """
+    Two-pass OCR of a page loaded with a coarse DPI (see
+    pdf_loader.load_page): text regions and their glyph heights are found
+    on the coarse raster, large print is OCR-ed straight from it, and only
+    finer print is re-rendered (PyMuPDF clip rects) at the DPI it needs,
+    up to the page's full DPI. Regions that still read poorly below the
+    full DPI get one more pass at it, keeping the better result.
+    """
+    page_num = page["page_number"]
+    pdf_page = page["pdf_page"]
+    coarse_dpi = page["dpi"]
+    fine_dpi = page["fine_dpi"]
+
+    with timed(profile, "preprocess"):
+        binary = preprocess_image(page["image"])
+
+    with timed(profile, "text_regions"):
+        regions = find_text_regions(binary, scale=coarse_dpi / 300)
+        if region_ink_share(regions, binary) >= MIN_INK_SHARE:
+            dpis = [
+                region_dpi(glyph_height(binary, region), coarse_dpi, fine_dpi)
+                for region in regions
+            ]
+        else:
+            # The regions missed most of the ink; read the whole page at
+            # the full DPI rather than drop its text
+            h, w = binary.shape[:2]
+            regions = [(0, 0, w, h, False)]
+            dpis = [fine_dpi]
+
+    with timed(profile, "render_regions"):
+        crops = [
+            _coarse_crop(binary, region) if dpi == coarse_dpi
+            else _render_region(pdf_page, region, coarse_dpi, dpi)
+            for region, dpi in zip(regions, dpis)
+        ]
+
+    ocr_pixels = sum(crop.shape[0] * crop.shape[1] for crop in crops)
+
+    with timed(profile, "ocr"):
+        results = ocr_crops(crops, engine, executor)
+
+    retry = [
+        i for i, (dpi, data) in enumerate(zip(dpis, results))
+        if dpi < fine_dpi and mean_confidence(data) < MIN_CONFIDENCE
+    ]
+
+    if retry:
+        with timed(profile, "render_regions"):
+            retry_crops = [
+                _render_region(pdf_page, regions[i], coarse_dpi, fine_dpi) for i in retry
+            ]
+        ocr_pixels += sum(crop.shape[0] * crop.shape[1] for crop in retry_crops)
+
+        with timed(profile, "ocr"):
+            retry_results = ocr_crops(retry_crops, engine, executor)
+
+        for i, crop, data in zip(retry, retry_crops, retry_results):
+            if mean_confidence(data) > mean_confidence(results[i]):
+                crops[i], results[i] = crop, data
+
+    if profile is not None:
+        profile.count("regions", len(regions))
+        profile.count("fine_regions", sum(1 for dpi in dpis if dpi > coarse_dpi))
+        profile.count("retried_regions", len(retry))
+        profile.count("ocr_pixels", ocr_pixels)
+
+    return merge_region_word_table(
+        [(data, crop.shape[1], crop.shape[0]) for data, crop in zip(results, crops)],
+        regions, binary.shape, page_num
+    )
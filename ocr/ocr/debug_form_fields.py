@@ -1,26 +1,28 @@
 """
 Debug visualizer to see what's being detected as form fields and their values
 """
-import json
+import os
+
+from ocr.block_index import BlockIndex
+from ocr.block_stream import load_blocks, open_blocks
 
 
 def visualize_form_field_detection(blocks, page_number):
     """
     Create a detailed debug output showing exactly what was detected
+    (`blocks` may be a block list or a BlockIndex)
     """
+    index = BlockIndex.of(blocks)
+
     print("\n" + "="*80)
     print(f"DEBUG: Form Field Detection for Page {page_number}")
     print("="*80)
     
     # Get form fields
-    form_fields = [b for b in blocks 
-                   if b.get("BlockType") == "FORM_FIELD" 
-                   and b.get("Page") == page_number]
+    form_fields = index.of_type("FORM_FIELD", page_number)
     
     # Get all lines for reference
-    lines = [b for b in blocks 
-             if b.get("BlockType") == "LINE" 
-             and b.get("Page") == page_number]
+    lines = index.of_type("LINE", page_number)
     
     print(f"\nTotal form fields detected: {len(form_fields)}")
     print(f"Total lines on page: {len(lines)}")
@@ -56,22 +58,22 @@ def debug_ocr_output(output_json_path):
     """
     Load and debug OCR output
     """
-    with open(output_json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    blocks = data.get("Blocks", [])
+    # Streamed outputs are read one page at a time
+    if output_json_path.endswith((".ndjson", ".npz")):
+        for page_num, blocks in open_blocks(output_json_path).iter_pages():
+            visualize_form_field_detection(blocks, page_num)
+        return
     
-    # Get unique pages
-    pages = set()
-    for block in blocks:
-        if "Page" in block:
-            pages.add(block["Page"])
+    index = BlockIndex(load_blocks(output_json_path))
     
     # Visualize each page
-    for page_num in sorted(pages):
-        visualize_form_field_detection(blocks, page_num)
+    for page_num in index.pages:
+        visualize_form_field_detection(index, page_num)
 
 
 if __name__ == "__main__":
     # Debug the output
-    debug_ocr_output("output/output_blocks.json")
\ No newline at end of file
+    output_path = "output/output_blocks.ndjson"
+    if not os.path.exists(output_path):
+        output_path = "output/output_blocks.json"
+    debug_ocr_output(output_path)
\ No newline at end of file
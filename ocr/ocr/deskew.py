@@ -0,0 +1,217 @@
+import cv2
+import numpy as np
+
+# Orientation and skew are estimated on the page shrunk by a whole
+# factor to at most this width
+ANALYSIS_WIDTH = 1300
+
+# Only glyph-sized ink is measured: rules, photos and dark bars would
+# swamp the line profile (fraction of the analysis image height)
+MAX_GLYPH_HEIGHT = 0.05
+MIN_INK_PIXELS = 5000
+
+# At most this many ink pixels are projected per candidate angle
+MAX_POINTS = 60000
+
+# Skew search range and steps (degrees); a coarse pass, then a fine one
+MAX_SKEW = 10.0
+COARSE_STEP = 1.0
+FINE_STEP = 0.1
+
+# Skew under this is left alone, so clean pages are never resampled
+MIN_SKEW = 0.3
+
+# A page is taken as level without the skew search when its row profile
+# at 0 degrees is this much more concentrated than COARSE_STEP either
+# side (and at least as concentrated as MIN_SKEW either side)
+LEVEL_MARGIN = 1.15
+
+# Text runs vertically (page turned by 90 degrees) when its column
+# profile is this much sharper than its row profile (upright text pages
+# score their columns at a small fraction of their rows)
+VERTICAL_MARGIN = 1.0
+
+# Upside down when descender ink outweighs ascender ink by this much
+# (Latin text has far more ascenders and capitals than descenders)
+FLIP_MARGIN = 1.0
+
+
+def deskew_settings():
+    """Everything that changes page rotation (used in OCR cache keys)."""
+    return {
+        "analysis_width": ANALYSIS_WIDTH,
+        "max_glyph_height": MAX_GLYPH_HEIGHT,
+        "min_ink_pixels": MIN_INK_PIXELS,
+        "max_skew": MAX_SKEW,
+        "fine_step": FINE_STEP,
+        "min_skew": MIN_SKEW,
+        "level_margin": LEVEL_MARGIN,
+        "vertical_margin": VERTICAL_MARGIN,
+        "flip_margin": FLIP_MARGIN
+    }
+
+
+def _glyph_points(image):
+    """(xs, ys, width, height) of glyph-sized ink on the shrunk page."""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+
+    # Whole factors take OpenCV's fast area-averaging path
+    factor = -(-gray.shape[1] // ANALYSIS_WIDTH)
+    small = cv2.resize(
+        gray, (gray.shape[1] // factor, gray.shape[0] // factor), interpolation=cv2.INTER_AREA
+    )
+    _, ink = cv2.threshold(small, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    max_height = MAX_GLYPH_HEIGHT * small.shape[0]
+    glyph = (stats[:, cv2.CC_STAT_HEIGHT] <= max_height) & (stats[:, cv2.CC_STAT_AREA] >= 2)
+    glyph[0] = False
+
+    ys, xs = np.nonzero(glyph[labels])
+    if len(xs) > MAX_POINTS:
+        step = -(-len(xs) // MAX_POINTS)
+        xs, ys = xs[::step], ys[::step]
+
+    return xs.astype(np.float64), ys.astype(np.float64), small.shape[1], small.shape[0]
+
+
+def _profile(xs, ys, angle):
+    """Row profile of the points after undoing a skew of `angle` degrees."""
+    theta = np.deg2rad(angle)
+    rows = ys * np.cos(theta) - xs * np.sin(theta)
+    return np.bincount(np.round(rows - rows.min()).astype(np.int64))
+
+
+def _sharpness(xs, ys, angle):
+    """
+    Squared row-to-row changes of the profile: text lines make steep
+    edges, while the column profile of the same text stays flat even
+    when its left margin is aligned.
+    """
+    # Spread each pixel over its cell: projecting a grid of integer points
+    # at a slant otherwise bins them in a comb pattern that looks sharp
+    jitter = np.random.default_rng(0).random((2, len(xs))) - 0.5
+    steps = np.diff(_profile(xs + jitter[0], ys + jitter[1], angle).astype(np.float64))
+    return float((steps * steps).sum())
+
+
+def _concentration(xs, ys, angle):
+    """Sum of squared row counts: highest when the text lines are level."""
+    profile = _profile(xs, ys, angle).astype(np.float64)
+    return float((profile * profile).sum())
+
+
+def _best_skew(xs, ys):
+    """The skew (degrees) whose row profile is most concentrated."""
+    coarse = np.arange(-MAX_SKEW, MAX_SKEW + COARSE_STEP / 2, COARSE_STEP)
+    scores = [_concentration(xs, ys, a) for a in coarse]
+    best = float(coarse[int(np.argmax(scores))])
+
+    fine = np.arange(best - COARSE_STEP, best + COARSE_STEP + FINE_STEP / 2, FINE_STEP)
+    scores = [_concentration(xs, ys, a) for a in fine]
+    return round(float(fine[int(np.argmax(scores))]), 2)
+
+
+def _is_upside_down(xs, ys, angle):
+    """Compare ink above and below the x-height band of every text line."""
+    profile = _profile(xs, ys, angle)
+
+    above = below = 0
+    rows = np.flatnonzero(profile)
+    if not len(rows):
+        return False
+
+    # Lines are runs of inked rows
+    breaks = np.flatnonzero(np.diff(rows) > 1)
+    for run in np.split(rows, breaks + 1):
+        line = profile[run[0]:run[-1] + 1]
+        if len(line) < 4:
+            continue
+        core = np.flatnonzero(line >= 0.5 * line.max())
+        above += int(line[:core[0]].sum())
+        below += int(line[core[-1] + 1:].sum())
+
+    return below > above * FLIP_MARGIN
+
+
+def _is_level(xs, ys):
+    """
+    Cheap check for the common case of horizontal, level text: a handful
+    of projections at and around 0 degrees instead of the skew searches.
+    """
+    level = _concentration(xs, ys, 0.0)
+    for angle in (MIN_SKEW, -MIN_SKEW):
+        if _concentration(xs, ys, angle) > level:
+            return False
+    for angle in (COARSE_STEP, -COARSE_STEP):
+        if _concentration(xs, ys, angle) * LEVEL_MARGIN > level:
+            return False
+
+    return _sharpness(ys, xs, 0.0) <= _sharpness(xs, ys, 0.0) * VERTICAL_MARGIN
+
+
+def detect_page_rotation(image):
+    """
+    Estimate how a page raster has to be turned for upright, level text:
+    (orientation, skew), both counterclockwise degrees - orientation a
+    multiple of 90, skew within ±MAX_SKEW (0.0 below MIN_SKEW). Pages
+    with too little text come back as (0, 0.0).
+    """
+    xs, ys, width, height = _glyph_points(image)
+    if len(xs) < MIN_INK_PIXELS:
+        return 0, 0.0
+
+    # Most pages are upright and level; confirming that takes a few
+    # projections instead of the skew searches
+    if _is_level(xs, ys):
+        return (180 if _is_upside_down(xs, ys, 0.0) else 0), 0.0
+
+    skew = _best_skew(xs, ys)
+    column_skew = _best_skew(ys, xs)
+
+    if _sharpness(ys, xs, column_skew) > _sharpness(xs, ys, skew) * VERTICAL_MARGIN:
+        # Turn 90 degrees counterclockwise: (x, y) -> (y, width - x)
+        xs, ys = ys, width - xs
+        orientation = 90
+        skew = _best_skew(xs, ys)
+    else:
+        orientation = 0
+
+    if _is_upside_down(xs, ys, skew):
+        orientation += 180
+
+    if abs(skew) < MIN_SKEW:
+        skew = 0.0
+    return orientation % 360, skew
+
+
+def rotate_page(image, orientation, skew, pool=None):
+    """
+    Turn a page raster by `orientation` + `skew` degrees counterclockwise
+    in a single pass (exact for multiples of 90). Quarter turns swap the
+    page's width and height; skew keeps the size and fills the corners
+    with white. With a BufferPool as `pool`, the result is written into
+    one of its buffers.
+    """
+    h, w = image.shape[:2]
+    quarter = orientation % 180 == 90
+    out_w, out_h = (h, w) if quarter else (w, h)
+    shape = (out_h, out_w) + image.shape[2:]
+    out = pool.acquire(shape) if pool is not None else None
+
+    if not skew:
+        turned = np.rot90(image, orientation // 90)
+        if out is None:
+            return np.ascontiguousarray(turned)
+        np.copyto(out, turned)
+        return out
+
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), orientation + skew, 1.0)
+    matrix[0, 2] += (out_w - w) / 2
+    matrix[1, 2] += (out_h - h) / 2
+
+    white = (255,) * (image.shape[2] if image.ndim == 3 else 1)
+    return cv2.warpAffine(
+        image, matrix, (out_w, out_h), dst=out,
+        flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT, borderValue=white
+    )
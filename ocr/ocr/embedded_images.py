@@ -0,0 +1,136 @@
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+
+# A scanned page is one image placed over at least this share of the page
+MIN_COVERAGE = 0.4
+
+# Native scans outside this resolution range are rendered at the
+# configured DPI instead (too coarse for Tesseract / needlessly large)
+MIN_DPI = 100
+MAX_DPI = 600
+
+
+def _has_vector_content(page):
+    """
+    True when the page draws anything besides its images: visible text
+    (an invisible OCR layer, render mode 3, does not count) or vector
+    graphics such as stamps, rules or form fields.
+    """
+    if page.get_text().strip():
+        if any(span["type"] != 3 and span["opacity"] > 0 for span in page.get_texttrace()):
+            return True
+    return bool(page.get_drawings())
+
+
+def scan_image_placement(page):
+    """
+    The get_image_info() entry of a page's only image when the page is a
+    plain scan: a single, unrotated, unflipped, axis-aligned image
+    covering at least MIN_COVERAGE of an unrotated page that draws
+    nothing else. None otherwise.
+    """
+    if page.rotation:
+        return None
+
+    placements = page.get_image_info(xrefs=True)
+    if len(placements) != 1 or len(page.get_images()) != 1:
+        return None
+
+    info = placements[0]
+    a, b, c, d, _, _ = info["transform"]
+    if not info["xref"] or b or c or a <= 0 or d <= 0:
+        return None
+
+    bbox = fitz.Rect(info["bbox"]) & page.rect
+    if abs(bbox) < MIN_COVERAGE * abs(page.rect):
+        return None
+
+    # Text or stamps drawn over or around the scan are only in a render
+    if _has_vector_content(page):
+        return None
+
+    return info
+
+
+def _pixmap_array(pix):
+    """Pixmap samples as (h, w) for gray or (h, w, 3) for color."""
+    if pix.alpha:
+        pix = fitz.Pixmap(pix, 0)
+    if pix.n not in (1, 3):
+        pix = fitz.Pixmap(fitz.csRGB, pix)
+
+    array = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)
+    array = array[:, :pix.width * pix.n]
+    if pix.n == 1:
+        return array
+    return array.reshape(pix.height, pix.width, pix.n)
+
+
+def decode_image(doc, xref):
+    """
+    Decode an image XObject at its native resolution and colorspace
+    (gray and bilevel images stay single-channel). A soft mask is
+    composited onto white, as the page render would.
+    """
+    image = _pixmap_array(fitz.Pixmap(doc, xref))
+
+    smask = doc.xref_get_key(xref, "SMask")
+    if smask[0] == "xref":
+        mask = _pixmap_array(fitz.Pixmap(doc, int(smask[1].split()[0])))
+        if mask.shape[:2] == image.shape[:2] and mask.min() < 255:
+            alpha = mask.astype(np.float32) / 255
+            if image.ndim == 3:
+                alpha = alpha[:, :, None]
+            image = (image * alpha + 255 * (1 - alpha)).astype(np.uint8)
+
+    return image
+
+
+def extract_scan_image(page):
+    """
+    A plain scan's embedded image (see scan_image_placement) at its native
+    resolution, placed on a white page-sized canvas at that resolution so
+    normalized geometry matches a page render. Returns (image, dpi) with
+    the scan's resolution rounded to whole DPI, or None when the page has
+    to be rendered.
+    """
+    info = scan_image_placement(page)
+    if info is None:
+        return None
+
+    bbox = fitz.Rect(info["bbox"])
+    transform = info["transform"]
+    width, height = info["width"], info["height"]
+
+    scale = width / transform[0]
+    dpi = scale * 72
+    if not MIN_DPI <= dpi <= MAX_DPI:
+        return None
+
+    image = decode_image(page.parent, info["xref"])
+    if image.shape[:2] != (height, width):
+        return None
+
+    # Images with non-square pixels are stretched onto the page grid
+    target_h = max(1, round(transform[3] * scale))
+    if target_h != height:
+        image = cv2.resize(image, (width, target_h), interpolation=cv2.INTER_AREA)
+
+    page_w = round(page.rect.width * scale)
+    page_h = round(page.rect.height * scale)
+    x0 = round((bbox.x0 - page.rect.x0) * scale)
+    y0 = round((bbox.y0 - page.rect.y0) * scale)
+
+    # The image may overhang the page (its bbox was clipped above)
+    src_x0, src_y0 = max(0, -x0), max(0, -y0)
+    x0, y0 = max(0, x0), max(0, y0)
+    x1 = min(page_w, x0 + image.shape[1] - src_x0)
+    y1 = min(page_h, y0 + image.shape[0] - src_y0)
+
+    if x0 == 0 and y0 == 0 and (x1, y1) == (page_w, page_h):
+        return np.ascontiguousarray(image[src_y0:src_y0 + y1, src_x0:src_x0 + x1]), round(dpi)
+
+    canvas = np.full((page_h, page_w) + image.shape[2:], 255, dtype=np.uint8)
+    canvas[y0:y1, x0:x1] = image[src_y0:src_y0 + (y1 - y0), src_x0:src_x0 + (x1 - x0)]
+    return canvas, round(dpi)
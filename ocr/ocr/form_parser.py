@@ -1,5 +1,6 @@
 import re
 from ocr.block_factory import create_block
+from ocr.spatial_index import WordIndex, build_page_word_indexes
 
 
 def is_form_field_label(text):
@@ -20,7 +21,19 @@ def is_form_field_label(text):
     return False
 
 
+SKIP_VALUE_WORDS = {"to:", "go", "or", "mail", "form", "paper", "online"}
+
+
 def extract_value_from_nearby_words(line, all_words, search_radius=0.05):
+    """
+    `all_words` is the page's WordIndex (a WordTable or plain word list
+    is indexed on the fly).
+    """
+    index = all_words if isinstance(all_words, WordIndex) else WordIndex(all_words)
+    table = index.table
+    texts = index.texts
+    label_like = index.flags(is_form_field_label)
+
     label_bbox = line["Geometry"]["BoundingBox"]
     label_right = label_bbox["Left"] + label_bbox["Width"]
     label_bottom = label_bbox["Top"] + label_bbox["Height"]
@@ -28,80 +41,58 @@ def extract_value_from_nearby_words(line, all_words, search_radius=0.05):
     label_text = line["Text"].strip()
 
     same_line_words = []
-    for word in all_words:
-        word_bbox = word["Geometry"]["BoundingBox"]
-        word_left = word_bbox["Left"]
-        word_top = word_bbox["Top"]
-        word_text = word["Text"].strip()
+    for i in index.right_of(label_right, label_right + 0.3, label_top, 0.015):
+        word_text = texts[i]
 
         if word_text in label_text:
             continue
 
-        if is_form_field_label(word_text):
+        if label_like[i]:
             continue
 
-        skip_words = ["to:", "go", "or", "mail", "form", "paper", "online"]
-        if word_text.lower() in skip_words:
+        if word_text.lower() in SKIP_VALUE_WORDS:
             continue
 
-        if (
-            word_left > label_right
-            and word_left < label_right + 0.3
-            and abs(word_top - label_top) < 0.015
-        ):
-            same_line_words.append(word)
+        same_line_words.append(i)
 
-    same_line_words.sort(key=lambda w: w["Geometry"]["BoundingBox"]["Left"])
+    lefts = table.left
+    widths = table.width
+
+    same_line_words.sort(key=lambda i: lefts[i])
 
     if same_line_words:
         value_words = [same_line_words[0]]
-        prev_right = (
-            same_line_words[0]["Geometry"]["BoundingBox"]["Left"]
-            + same_line_words[0]["Geometry"]["BoundingBox"]["Width"]
-        )
+        prev_right = lefts[same_line_words[0]] + widths[same_line_words[0]]
 
-        for word in same_line_words[1:]:
-            word_left = word["Geometry"]["BoundingBox"]["Left"]
-            gap = word_left - prev_right
+        for i in same_line_words[1:]:
+            gap = lefts[i] - prev_right
             if gap > 0.05:
                 break
-            value_words.append(word)
-            prev_right = word_left + word["Geometry"]["BoundingBox"]["Width"]
+            value_words.append(i)
+            prev_right = lefts[i] + widths[i]
 
-        result = " ".join(w["Text"] for w in value_words[:5])
+        result = " ".join(texts[i] for i in value_words[:5])
 
         if not is_form_field_label(result) and len(result) > 0:
             return result
 
     below_words = []
-    for word in all_words:
-        word_bbox = word["Geometry"]["BoundingBox"]
-        word_top = word_bbox["Top"]
-        word_left = word_bbox["Left"]
-        word_text = word["Text"].strip()
+    for i in index.below(label_bottom, 0.025, label_bbox["Left"], 0.05):
+        word_text = texts[i]
 
         if word_text in label_text:
             continue
 
-        if is_form_field_label(word_text):
+        if label_like[i]:
             continue
 
-        if (
-            word_top > label_bottom
-            and word_top < label_bottom + 0.025
-            and abs(word_left - label_bbox["Left"]) < 0.05
-        ):
-            below_words.append(word)
-
-    below_words.sort(
-        key=lambda w: (
-            w["Geometry"]["BoundingBox"]["Top"],
-            w["Geometry"]["BoundingBox"]["Left"],
-        )
-    )
+        below_words.append(i)
+
+    tops = table.top
+    below_words.sort(key=lambda i: (tops[i], lefts[i]))
 
     if below_words:
-        result = " ".join(w["Text"] for w in below_words[:6])
+        result = " ".join(texts[i] for i in below_words[:6])
         if not is_form_field_label(result) and len(result) > 0:
             return result
 
@@ -124,15 +115,11 @@ def split_multi_field_line(text):
     return [text]
 
 
-def extract_form_fields_with_values(line_blocks, word_blocks):
+def extract_form_fields_with_values(line_blocks, word_blocks, word_indexes=None):
     form_fields = []
 
-    page_words = {}
-    for word in word_blocks:
-        page = word.get("Page", 1)
-        if page not in page_words:
-            page_words[page] = []
-        page_words[page].append(word)
+    if word_indexes is None:
+        word_indexes = build_page_word_indexes(word_blocks)
 
     for line in line_blocks:
         text = line["Text"].strip()
@@ -199,7 +186,7 @@ def extract_form_fields_with_values(line_blocks, word_blocks):
             continue
 
         page = line.get("Page", 1)
-        words_on_page = page_words.get(page, [])
+        words_on_page = word_indexes.get(page) or WordIndex([])
 
         label = text
         value_text = ""
@@ -325,9 +312,15 @@ def extract_form_fields_with_values(line_blocks, word_blocks):
 
 
 
-def detect_checkboxes_with_state(word_blocks, line_blocks):
+CHECKBOX_MARKS = set("☐☑☒□■[")
+
+
+def detect_checkboxes_with_state(word_blocks, line_blocks, word_indexes=None):
     checkboxes = []
 
+    if word_indexes is None:
+        word_indexes = build_page_word_indexes(word_blocks)
+
     checkbox_patterns = [
         (r"☐", False),
         (r"☑", True),
@@ -339,19 +332,24 @@ def detect_checkboxes_with_state(word_blocks, line_blocks):
         (r"\[x\]", True),
     ]
 
-    for word in word_blocks:
-        text = word["Text"].strip()
-        for pattern, is_checked in checkbox_patterns:
-            if re.search(pattern, text):
-                checkbox_block = create_block(
-                    "CHECKBOX",
-                    Text=text,
-                    Checked=is_checked,
-                    Page=word.get("Page", 1),
-                    Geometry=word["Geometry"],
-                )
-                checkboxes.append(checkbox_block)
-                break
+    for page, index in word_indexes.items():
+        for i, text in enumerate(index.texts):
+            # Every pattern needs one of these characters; skip the regexes
+            # for the vast majority of words that have none
+            if CHECKBOX_MARKS.isdisjoint(text):
+                continue
+
+            for pattern, is_checked in checkbox_patterns:
+                if re.search(pattern, text):
+                    checkbox_block = create_block(
+                        "CHECKBOX",
+                        Text=text,
+                        Checked=is_checked,
+                        Page=page,
+                        Geometry=index.table.geometry(i),
+                    )
+                    checkboxes.append(checkbox_block)
+                    break
 
     for line in line_blocks:
         text = line["Text"].strip()
@@ -448,10 +446,17 @@ def detect_multi_column_layout(line_blocks, column_threshold=0.4):
 def build_form_blocks(line_blocks, word_blocks):
     all_form_blocks = []
 
-    form_fields = extract_form_fields_with_values(line_blocks, word_blocks)
+    # One spatial index per page, shared by every builder below
+    word_indexes = build_page_word_indexes(word_blocks)
+
+    form_fields = extract_form_fields_with_values(
+        line_blocks, word_blocks, word_indexes
+    )
     all_form_blocks.extend(form_fields)
 
-    checkboxes = detect_checkboxes_with_state(word_blocks, line_blocks)
+    checkboxes = detect_checkboxes_with_state(
+        word_blocks, line_blocks, word_indexes
+    )
     all_form_blocks.extend(checkboxes)
 
     kv_pairs = extract_key_value_pairs(line_blocks)
@@ -1,14 +1,36 @@
 import cv2
 
-def preprocess_image(image):
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+MEDIAN_BLUR_KSIZE = 3
+
+
+def preprocess_settings():
+    """Everything that changes preprocess_image's output (used in OCR cache keys)."""
+    return {
+        "median_blur": MEDIAN_BLUR_KSIZE,
+        "threshold": "otsu"
+    }
+
+
+def preprocess_image(image, out=None):
+    """
+    Binarize a page raster (RGB or single-channel). With `out` (a uint8
+    array of the page's height and width, e.g. from a BufferPool) the
+    blur and threshold run in that buffer and it is returned; `image`
+    itself is never modified.
+    """
+    # Grayscale renders and gray / bilevel scans arrive single-channel
+    if image.ndim == 3:
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=out)
+        out = gray
+    else:
+        gray = image
 
     # Noise removal
-    gray = cv2.medianBlur(gray, 3)
+    gray = cv2.medianBlur(gray, MEDIAN_BLUR_KSIZE, dst=out)
 
-    # Thresholding
+    # Thresholding (in place)
     _, thresh = cv2.threshold(
-        gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU
+        gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=gray
     )
 
     return thresh
@@ -0,0 +1,119 @@
+import json
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_kb():
+    """Process high-water-mark RSS in KiB, or None where unavailable."""
+    if resource is None:
+        return None
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux KiB
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+class PageProfile:
+    """
+    Stage timings and counters for one page. Each stage records wall
+    time, this thread's CPU time and the process peak RSS after the
+    stage; a handful of clock reads, cheap enough to leave on.
+    """
+
+    def __init__(self, page_number):
+        self.page_number = page_number
+        self.stages = {}
+        self.counters = {}
+
+    @contextmanager
+    def stage(self, name):
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            record = self.stages.setdefault(name, {"wall_ms": 0.0, "cpu_ms": 0.0})
+            record["wall_ms"] += (time.perf_counter() - wall_start) * 1000
+            record["cpu_ms"] += (time.thread_time() - cpu_start) * 1000
+            record["peak_rss_kb"] = peak_rss_kb()
+
+    def count(self, name, value):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_dict(self):
+        return {
+            "page": self.page_number,
+            **self.counters,
+            "wall_ms": sum(s["wall_ms"] for s in self.stages.values()),
+            "peak_rss_kb": peak_rss_kb(),
+            "stages": self.stages
+        }
+
+
+def timed(profile, name):
+    """`profile.stage(name)`, or a no-op when profiling is off."""
+    return profile.stage(name) if profile is not None else nullcontext()
+
+
+class Profiler:
+    """
+    Collects PageProfiles (local or reported back by pool workers) plus
+    document-level stages, and renders them as a JSON report.
+    """
+
+    def __init__(self):
+        self.pages = []
+        self.document = PageProfile(None)
+        self._start = time.perf_counter()
+
+    def page(self, page_number):
+        return PageProfile(page_number)
+
+    def add_page(self, page_record):
+        self.pages.append(page_record)
+
+    def stage(self, name):
+        return self.document.stage(name)
+
+    def report(self, **extra):
+        pages = sorted(self.pages, key=lambda p: p["page"])
+
+        summary = {}
+        for page in pages:
+            for name, record in page["stages"].items():
+                stage = summary.setdefault(name, {
+                    "pages": 0, "total_wall_ms": 0.0, "max_wall_ms": 0.0,
+                    "total_cpu_ms": 0.0
+                })
+                stage["pages"] += 1
+                stage["total_wall_ms"] += record["wall_ms"]
+                stage["total_cpu_ms"] += record["cpu_ms"]
+                stage["max_wall_ms"] = max(stage["max_wall_ms"], record["wall_ms"])
+
+        for stage in summary.values():
+            stage["mean_wall_ms"] = stage["total_wall_ms"] / stage["pages"]
+
+        wall_ms = (time.perf_counter() - self._start) * 1000
+
+        return {
+            "document": {
+                "pages": len(pages),
+                "wall_ms": wall_ms,
+                "pages_per_sec": len(pages) / (wall_ms / 1000) if wall_ms else 0.0,
+                "peak_rss_kb": peak_rss_kb(),
+                "stages": self.document.stages,
+                **extra
+            },
+            "stages": summary,
+            "pages": pages
+        }
+
+    def save(self, path, **extra):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(**extra), f, indent=2)
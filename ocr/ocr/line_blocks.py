@@ -1,78 +1,181 @@
+from bisect import bisect_right
+
+import numpy as np
+
 from ocr.block_factory import create_block
+from ocr.page_model import WordTable
 
-def group_words_into_lines(word_blocks, y_threshold=0.015):
-    lines = []
 
-    # Sort words top → bottom
-    sorted_words = sorted(
-        word_blocks,
-        key=lambda w: w["Geometry"]["BoundingBox"]["Top"]
+def union_bounding_box(blocks):
+    left = min(b["Geometry"]["BoundingBox"]["Left"] for b in blocks)
+    top = min(b["Geometry"]["BoundingBox"]["Top"] for b in blocks)
+    right = max(
+        b["Geometry"]["BoundingBox"]["Left"] +
+        b["Geometry"]["BoundingBox"]["Width"]
+        for b in blocks
+    )
+    bottom = max(
+        b["Geometry"]["BoundingBox"]["Top"] +
+        b["Geometry"]["BoundingBox"]["Height"]
+        for b in blocks
     )
 
-    for word in sorted_words:
-        placed = False
-        word_top = word["Geometry"]["BoundingBox"]["Top"]
+    return {
+        "Left": left,
+        "Top": top,
+        "Width": right - left,
+        "Height": bottom - top
+    }
 
-        for line in lines:
-            line_top = line["words"][0]["Geometry"]["BoundingBox"]["Top"]
 
-            if abs(line_top - word_top) < y_threshold:
-                line["words"].append(word)
-                placed = True
-                break
+def create_line_block(table, indices):
+    """LINE block over the given WordTable rows, in the given order."""
+    rows = np.asarray(indices)
 
-        if not placed:
-            lines.append({
-                "words": [word]
-            })
+    left = float(table.left[rows].min())
+    top = float(table.top[rows].min())
+    right = float(table.right[rows].max())
+    bottom = float(table.bottom[rows].max())
 
-    line_blocks = []
+    return create_block(
+        "LINE",
+        Text=" ".join(table.texts[i] for i in indices),
+        Confidence=sum(table.confidence[rows].tolist()) / len(indices),
+        Page=table.page_num,
+        Geometry={
+            "BoundingBox": {
+                "Left": left,
+                "Top": top,
+                "Width": right - left,
+                "Height": bottom - top
+            }
+        },
+        Relationships=[{
+            "Type": "CHILD",
+            "Ids": [table.ids[i] for i in indices]
+        }]
+    )
+
+
+def group_words_into_lines(word_blocks, y_threshold=0.015):
+    """
+    Geometric line clustering, for word sources without a layout
+    hierarchy (PDF text layer, external OCR). Takes a WordTable or a list
+    of WORD blocks from a single page.
 
-    for line in lines:
-        words = line["words"]
+    A word joins the first line whose first word sits within
+    `y_threshold` of it. Words are visited top → bottom, so line tops are
+    non-decreasing and that line can be found by bisection.
+    """
+    table = WordTable.of(word_blocks)
 
+    tops = table.top.tolist()
+    lefts = table.left.tolist()
+
+    lines = []
+    line_tops = []
+
+    # Visit words top → bottom (stable, like sorted())
+    for i in np.argsort(table.top, kind="stable").tolist():
+        word_top = tops[i]
+
+        index = bisect_right(line_tops, word_top - y_threshold)
+
+        if index < len(lines):
+            lines[index].append(i)
+        else:
+            lines.append([i])
+            line_tops.append(word_top)
+
+    line_blocks = []
+
+    for members in lines:
         # Sort words left → right
-        words.sort(
-            key=lambda w: w["Geometry"]["BoundingBox"]["Left"]
-        )
-
-        text = " ".join(w["Text"] for w in words)
-
-        left = min(w["Geometry"]["BoundingBox"]["Left"] for w in words)
-        top = min(w["Geometry"]["BoundingBox"]["Top"] for w in words)
-        right = max(
-            w["Geometry"]["BoundingBox"]["Left"] +
-            w["Geometry"]["BoundingBox"]["Width"]
-            for w in words
-        )
-        bottom = max(
-            w["Geometry"]["BoundingBox"]["Top"] +
-            w["Geometry"]["BoundingBox"]["Height"]
-            for w in words
-        )
-
-        # FIX: Get page number from first word
-        page_num = words[0].get("Page", 1)
-
-        line_block = create_block(
-            "LINE",
-            Text=text,
-            Confidence=sum(w["Confidence"] for w in words) / len(words),
-            Page=page_num,  # FIX: Add Page attribute
-            Geometry={
-                "BoundingBox": {
-                    "Left": left,
-                    "Top": top,
-                    "Width": right - left,
-                    "Height": bottom - top
-                }
-            },
-            Relationships=[{
-                "Type": "CHILD",
-                "Ids": [w["Id"] for w in words]
-            }]
-        )
-
-        line_blocks.append(line_block)
-
-    return line_blocks
\ No newline at end of file
+        members.sort(key=lambda i: lefts[i])
+
+        line_blocks.append(create_line_block(table, members))
+
+    return line_blocks
+
+
+def group_words_by_layout(word_blocks):
+    """
+    Build LINE and PARAGRAPH blocks from Tesseract's block/paragraph/line
+    numbering. Words arrive in Tesseract's reading order, so runs of
+    equal numbering are found with one vectorized comparison, and lines
+    that belong to different columns are never merged.
+    """
+    table = WordTable.of(word_blocks)
+    count = len(table)
+
+    if count == 0:
+        return [], []
+
+    layout = table.layout
+
+    line_starts = np.ones(count, dtype=bool)
+    line_starts[1:] = np.any(layout[1:] != layout[:-1], axis=1)
+
+    paragraph_starts = np.ones(count, dtype=bool)
+    paragraph_starts[1:] = np.any(layout[1:, :2] != layout[:-1, :2], axis=1)
+
+    starts = np.flatnonzero(line_starts).tolist()
+    ends = starts[1:] + [count]
+
+    line_blocks = [
+        create_line_block(table, list(range(start, end)))
+        for start, end in zip(starts, ends)
+    ]
+
+    # A paragraph change always starts a new line, so each line belongs
+    # to exactly one paragraph
+    line_paragraphs = np.cumsum(paragraph_starts)[starts].tolist()
+
+    paragraph_blocks = []
+    paragraph_lines = [line_blocks[0]]
+
+    for line, paragraph, previous in zip(
+        line_blocks[1:], line_paragraphs[1:], line_paragraphs[:-1]
+    ):
+        if paragraph != previous:
+            paragraph_blocks.append(create_paragraph_block(paragraph_lines))
+            paragraph_lines = []
+        paragraph_lines.append(line)
+
+    paragraph_blocks.append(create_paragraph_block(paragraph_lines))
+
+    return line_blocks, paragraph_blocks
+
+
+def create_paragraph_block(paragraph_lines):
+    return create_block(
+        "PARAGRAPH",
+        Text="\n".join(l["Text"] for l in paragraph_lines),
+        Confidence=(
+            sum(l["Confidence"] for l in paragraph_lines)
+            / len(paragraph_lines)
+        ),
+        Page=paragraph_lines[0].get("Page", 1),
+        Geometry={
+            "BoundingBox": union_bounding_box(paragraph_lines)
+        },
+        Relationships=[{
+            "Type": "CHILD",
+            "Ids": [l["Id"] for l in paragraph_lines]
+        }]
+    )
+
+
+def build_line_blocks(word_blocks):
+    """
+    Return (line_blocks, paragraph_blocks) for a WordTable or a list of
+    one page's WORD blocks. Uses the Tesseract layout hierarchy when the
+    words carry one, otherwise falls back to geometric clustering (no
+    paragraphs).
+    """
+    table = WordTable.of(word_blocks)
+
+    if len(table) and table.layout is not None:
+        return group_words_by_layout(table)
+
+    return group_words_into_lines(table), []
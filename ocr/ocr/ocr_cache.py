@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from ocr.block_factory import create_block
+
+
+# WORD attributes worth caching; Id and Page are reassigned on every hit
+WORD_FIELDS = ("Text", "Confidence", "Geometry", "Layout")
+
+
+class OcrCache:
+    """
+    Content-addressed, size-bounded on-disk cache of WORD-level OCR
+    results.
+
+    Entries are keyed by a hash of the rendered page pixels plus every
+    setting that changes the OCR output (DPI, language, engine,
+    preprocessing). Reads refresh an entry's mtime and eviction removes
+    the least recently used entries once the cache grows past `max_bytes`.
+    Writes are atomic renames, so several processes can share one
+    directory. `size` is the directory's current total when the caller
+    already knows it (e.g. pool workers sharing the parent's cache),
+    which saves walking the directory again.
+    """
+
+    def __init__(self, cache_dir, max_bytes=256 * 1024 * 1024, size=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        if size is None:
+            size = sum(size for _, _, size in self._entries())
+        self._size = size
+
+    def make_key(self, image, **settings):
+        image = np.ascontiguousarray(image)
+
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(repr((image.shape, image.dtype.str)).encode())
+        digest.update(json.dumps(settings, sort_keys=True).encode())
+        digest.update(memoryview(image).cast("B"))
+
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".json")
+
+    def get(self, key, page_num):
+        """Return fresh WORD blocks for `page_num`, or None on a miss."""
+        path = self._path(key)
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                records = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+
+        blocks = []
+        for record in records:
+            # Same key order as extract_word_blocks
+            block = create_block(
+                "WORD",
+                Text=record["Text"],
+                Confidence=record["Confidence"],
+                Page=page_num
+            )
+            block.update(record)
+            blocks.append(block)
+
+        return blocks
+
+    def put(self, key, word_blocks):
+        records = [
+            {field: w[field] for field in WORD_FIELDS if field in w}
+            for w in word_blocks
+        ]
+
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        try:
+            # An entry being replaced no longer counts towards the total
+            old_size = os.path.getsize(path)
+        except OSError:
+            old_size = 0
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(records, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        self._size += os.path.getsize(path) - old_size
+        if self._size > self.max_bytes:
+            self._evict()
+
+    def _entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat.st_mtime, stat.st_size
+
+    def _evict(self):
+        # Rescan rather than trust the running total: other processes may
+        # be writing to the same directory
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        self._size = sum(size for _, _, size in entries)
+
+        # Trim to 90% so we don't rescan on every subsequent put
+        target = self.max_bytes * 0.9
+        for path, _, size in entries:
+            if self._size <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._size -= size
+            self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size_bytes": self._size
+        }
+
+    def add_stats(self, stats):
+        """
+        Fold in counters reported by another process's cache on the same
+        directory; its size is the most recent view of the directory.
+        """
+        self.hits += stats["hits"]
+        self.misses += stats["misses"]
+        self.evictions += stats["evictions"]
+        self._size = stats["size_bytes"]
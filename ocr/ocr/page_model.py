@@ -0,0 +1,160 @@
+import sys
+
+import numpy as np
+
+from ocr.block_factory import new_ids
+
+
+class WordTable:
+    """
+    Columnar WORD storage for one page.
+
+    Geometry and confidence live in NumPy float64 arrays, text in a list
+    of interned strings and Tesseract's block/paragraph/line numbering in
+    an (n, 3) int array. Line, form and table building work on these
+    columns directly; Textract-style WORD dicts are only built by
+    to_blocks() when the page is serialized.
+    """
+
+    def __init__(self, page_num, texts, left, top, width, height, confidence,
+                 layout=None, ids=None, blocks=None):
+        self.page_num = page_num
+        self.texts = [sys.intern(t) for t in texts]
+
+        self.left = np.asarray(left, dtype=np.float64)
+        self.top = np.asarray(top, dtype=np.float64)
+        self.width = np.asarray(width, dtype=np.float64)
+        self.height = np.asarray(height, dtype=np.float64)
+        self.confidence = np.asarray(confidence, dtype=np.float64)
+
+        self.layout = None if layout is None else np.asarray(layout, dtype=np.int32).reshape(-1, 3)
+        self.ids = ids if ids is not None else new_ids("WORD", len(self.texts))
+
+        self._blocks = blocks
+
+    def __len__(self):
+        return len(self.texts)
+
+    @property
+    def right(self):
+        return self.left + self.width
+
+    @property
+    def bottom(self):
+        return self.top + self.height
+
+    @classmethod
+    def from_tesseract(cls, data, image_width, image_height, page_num):
+        """Build from an image_to_data(Output.DICT)-shaped dict, skipping empty words."""
+        keep = [i for i, text in enumerate(data["text"]) if text.strip()]
+
+        def column(key):
+            return np.asarray([data[key][i] for i in keep], dtype=np.float64)
+
+        layout = None
+        if "block_num" in data:
+            layout = [
+                (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+                for i in keep
+            ]
+
+        return cls(
+            page_num,
+            [data["text"][i].strip() for i in keep],
+            column("left") / image_width,
+            column("top") / image_height,
+            column("width") / image_width,
+            column("height") / image_height,
+            [float(data["conf"][i]) for i in keep],
+            layout=layout
+        )
+
+    @classmethod
+    def from_text_layer(cls, text_words, page_num):
+        """Build from pdf_loader.extract_text_layer_words output; confidence is 100."""
+        return cls(
+            page_num,
+            [w["text"] for w in text_words],
+            [w["left"] for w in text_words],
+            [w["top"] for w in text_words],
+            [w["width"] for w in text_words],
+            [w["height"] for w in text_words],
+            [100.0] * len(text_words)
+        )
+
+    @classmethod
+    def from_blocks(cls, word_blocks, page_num=None):
+        """
+        Wrap existing WORD dicts (cache hits, replayed output). The
+        original dicts are kept and returned by to_blocks().
+        """
+        word_blocks = list(word_blocks)
+        if page_num is None:
+            page_num = word_blocks[0].get("Page", 1) if word_blocks else 1
+
+        boxes = [w["Geometry"]["BoundingBox"] for w in word_blocks]
+
+        layout = None
+        if word_blocks and all("Layout" in w for w in word_blocks):
+            layout = [
+                (w["Layout"]["Block"], w["Layout"]["Paragraph"], w["Layout"]["Line"])
+                for w in word_blocks
+            ]
+
+        return cls(
+            page_num,
+            [w["Text"] for w in word_blocks],
+            [b["Left"] for b in boxes],
+            [b["Top"] for b in boxes],
+            [b["Width"] for b in boxes],
+            [b["Height"] for b in boxes],
+            [w["Confidence"] for w in word_blocks],
+            layout=layout,
+            ids=[w["Id"] for w in word_blocks],
+            blocks=word_blocks
+        )
+
+    @classmethod
+    def of(cls, words):
+        """Return `words` if it is already a WordTable, else wrap the dicts."""
+        return words if isinstance(words, cls) else cls.from_blocks(words)
+
+    def bounding_box(self, i):
+        return {
+            "Left": float(self.left[i]),
+            "Top": float(self.top[i]),
+            "Width": float(self.width[i]),
+            "Height": float(self.height[i])
+        }
+
+    def geometry(self, i):
+        if self._blocks is not None:
+            return self._blocks[i]["Geometry"]
+        return {"BoundingBox": self.bounding_box(i)}
+
+    def to_blocks(self):
+        """Textract-style WORD dicts, built once and reused."""
+        if self._blocks is None:
+            blocks = []
+            for i, text in enumerate(self.texts):
+                fields = {
+                    "Text": text,
+                    "Confidence": float(self.confidence[i]),
+                    "Page": self.page_num,
+                    "Geometry": {"BoundingBox": self.bounding_box(i)}
+                }
+                if self.layout is not None:
+                    block_num, par_num, line_num = self.layout[i].tolist()
+                    fields["Layout"] = {
+                        "Block": block_num,
+                        "Paragraph": par_num,
+                        "Line": line_num
+                    }
+
+                # Same shape as create_block("WORD", ...), reusing the
+                # Id that LINE relationships already point at
+                blocks.append({"Id": self.ids[i], "BlockType": "WORD", **fields})
+
+            self._blocks = blocks
+
+        return self._blocks
@@ -0,0 +1,53 @@
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+
+# Low-resolution grayscale probe; a letter page is ~306x396 px at 36 DPI
+TRIAGE_DPI = 36
+
+# Pixels darker than this count as ink
+INK_LEVEL = 160
+
+# Scanner shadows and punch holes sit at the edges; ignore this fraction
+# of each side
+MARGIN = 0.04
+
+# Blank when both hold: almost no ink, and at most a few marks (a page
+# number or a stray speck); real text pages have hundreds of components
+MAX_INK_RATIO = 0.002
+MAX_COMPONENTS = 3
+MIN_COMPONENT_AREA = 2
+
+
+def page_ink_stats(page, dpi=TRIAGE_DPI):
+    """Ink ratio and connected-component count of a low-res grayscale render."""
+    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+    gray = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)
+    gray = gray[:, :pix.width]
+
+    dy = int(pix.height * MARGIN)
+    dx = int(pix.width * MARGIN)
+    ink = (gray[dy:pix.height - dy, dx:pix.width - dx] < INK_LEVEL).astype(np.uint8)
+
+    if not ink.size:
+        return {"ink_ratio": 0.0, "components": 0}
+
+    count, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    areas = stats[1:, cv2.CC_STAT_AREA]
+
+    return {
+        "ink_ratio": float(ink.mean()),
+        "components": int((areas >= MIN_COMPONENT_AREA).sum())
+    }
+
+
+def blank_page_reason(page):
+    """
+    "BLANK" if the page is blank or near-blank and OCR can be skipped,
+    else None.
+    """
+    stats = page_ink_stats(page)
+
+    if stats["ink_ratio"] <= MAX_INK_RATIO and stats["components"] <= MAX_COMPONENTS:
+        return "BLANK"
+    return None
@@ -1,20 +1,249 @@
+import threading
+
 import fitz  # PyMuPDF
 import numpy as np
 
-def pdf_to_images(pdf_path, dpi=300):
-    doc = fitz.open(pdf_path)
-    pages = []
+from ocr.page_triage import blank_page_reason
+from ocr.embedded_images import extract_scan_image
+from ocr.adaptive_dpi import choose_page_dpi
+
 
-    for page_index in range(len(doc)):
-        page = doc[page_index]
-        pix = page.get_pixmap(dpi=dpi)
+def render_page(page, dpi=300, clip=None, grayscale=False, pool=None):
+    """
+    Render a page (or just its `clip` rect, in page coordinates) to an
+    (h, w, 3) RGB array, or straight to a single-channel (h, w) one with
+    `grayscale`.
 
+    With a BufferPool as `pool`, the pixmap is copied directly into one
+    of its reusable buffers (release it when the page is done) instead of
+    into a freshly allocated array.
+    """
+    pix = page.get_pixmap(
+        dpi=dpi, clip=clip, colorspace=fitz.csGRAY if grayscale else fitz.csRGB
+    )
+    shape = (pix.height, pix.width) if pix.n == 1 else (pix.height, pix.width, pix.n)
+
+    if pool is None:
         img = np.frombuffer(pix.samples, dtype=np.uint8)
-        img = img.reshape(pix.height, pix.width, pix.n)
+        return img.reshape(shape)
+
+    samples = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.stride)
+    img = pool.acquire(shape)
+    np.copyto(img.reshape(pix.height, -1), samples[:, :pix.width * pix.n])
+    return img
+
+
+def open_pdf(pdf_path):
+    """Open a PDF from a path or from in-memory bytes (e.g. an upload)."""
+    if isinstance(pdf_path, (bytes, bytearray, memoryview)):
+        return fitz.open(stream=pdf_path, filetype="pdf")
+    return fitz.open(pdf_path)
+
+
+class ThreadDocuments:
+    """
+    One open copy of a PDF per thread. A PyMuPDF document must not be
+    used by two threads at once, so threads that render or re-render
+    pages concurrently each get() their own. close() closes every copy
+    once no thread uses them any more.
+    """
+
+    def __init__(self, pdf_path):
+        self.pdf_path = pdf_path
+        self._local = threading.local()
+        self._docs = []
+        self._lock = threading.Lock()
+
+    def get(self):
+        doc = getattr(self._local, "doc", None)
+        if doc is None:
+            doc = self._local.doc = open_pdf(self.pdf_path)
+            with self._lock:
+                self._docs.append(doc)
+        return doc
+
+    def close(self):
+        with self._lock:
+            docs, self._docs = self._docs, []
+        for doc in docs:
+            doc.close()
+
+
+def count_pages(pdf_path):
+    with open_pdf(pdf_path) as doc:
+        return len(doc)
+
+
+def has_usable_text_layer(page, words, min_words=20, max_garbage_ratio=0.1):
+    """
+    Decide whether a page's embedded text can replace OCR.
+
+    Scans usually carry no text at all, or only a stamp/header (e.g. a
+    DocuSign envelope id) on top of a full-page image, so a page that is
+    mostly image must also have enough words inside that image.
+    """
+    if len(words) < min_words:
+        return False
+
+    garbage = sum(
+        1 for w in words
+        if "�" in w[4] or not w[4].isprintable()
+    )
+    if garbage / len(words) > max_garbage_ratio:
+        return False
+
+    page_area = abs(page.rect)
+    for info in page.get_image_info():
+        image_rect = fitz.Rect(info["bbox"]) & page.rect
+        if abs(image_rect) < 0.5 * page_area:
+            continue
+
+        covered = sum(
+            1 for w in words
+            if fitz.Rect(w[:4]).intersects(image_rect)
+        )
+        if covered < min_words:
+            return False
+
+    return True
+
+
+def extract_text_layer_words(page):
+    """
+    Return the page's embedded words as normalized boxes, in the same
+    page-relative coordinate space as the rendered image.
+    """
+    words = []
+    width = page.rect.width
+    height = page.rect.height
+    matrix = page.rotation_matrix
 
-        pages.append({
-            "page_number": page_index + 1,
-            "image": img
+    for x0, y0, x1, y1, text, *_ in page.get_text("words", sort=True):
+        text = text.strip()
+        if not text:
+            continue
+
+        rect = fitz.Rect(x0, y0, x1, y1) * matrix
+        words.append({
+            "text": text,
+            "left": rect.x0 / width,
+            "top": rect.y0 / height,
+            "width": rect.width / width,
+            "height": rect.height / height
         })
 
-    return pages
\ No newline at end of file
+    return words
+
+
+def load_page(page, dpi=300, use_text_layer=False, text_layer_min_words=20,
+              skip_blank_pages=False, coarse_dpi=None, keep_pdf_page=False,
+              embedded_images=False, grayscale=False, pool=None, adaptive_dpi=False):
+    """
+    Classify a page as born-digital, blank or scanned.
+
+    Born-digital pages come back with their text-layer words and no
+    raster; with `skip_blank_pages`, blank pages (see page_triage) come
+    back with a "skipped" reason and no raster; scanned pages are
+    rendered for OCR.
+
+    With `embedded_images`, plain scans (one full-page image, see
+    embedded_images) skip rendering: the image is decoded at its native
+    resolution and colorspace, and "dpi" is that resolution.
+
+    With `coarse_dpi`, scanned pages are only rendered at that DPI and
+    regions are re-rendered up to `dpi` later (see coarse_to_fine). For
+    that, and with `keep_pdf_page` (see word_refinement), scanned pages
+    keep their PyMuPDF page as "pdf_page"; they must then be processed
+    before the document is closed.
+
+    With `adaptive_dpi`, rendered pages are probed at a low resolution
+    first and `dpi` is replaced by the DPI that brings their text to the
+    size Tesseract reads best (see adaptive_dpi); with `coarse_dpi`, it
+    caps the regions' re-render DPI instead. These pages, and plain scans
+    at their native resolution, are flagged "adaptive_dpi".
+
+    With `grayscale`, pages are rendered single-channel; with a BufferPool
+    as `pool`, into reusable buffers (see render_page).
+    """
+    page_data = {"page_number": page.number + 1, "dpi": dpi}
+
+    if use_text_layer:
+        raw_words = page.get_text("words")
+        if has_usable_text_layer(page, raw_words, min_words=text_layer_min_words):
+            page_data["text_words"] = extract_text_layer_words(page)
+            page_data["image"] = None
+            return page_data
+
+    if skip_blank_pages:
+        reason = blank_page_reason(page)
+        if reason is not None:
+            page_data["skipped"] = reason
+            page_data["image"] = None
+            return page_data
+
+    if adaptive_dpi:
+        page_data["adaptive_dpi"] = True
+
+    scan = extract_scan_image(page) if embedded_images else None
+    if scan is not None:
+        page_data["image"], page_data["dpi"] = scan
+        if keep_pdf_page:
+            page_data["pdf_page"] = page
+        return page_data
+
+    if adaptive_dpi:
+        dpi = page_data["dpi"] = choose_page_dpi(page, dpi)
+        if coarse_dpi and coarse_dpi >= dpi:
+            # Nothing finer to re-render; the page is read at its own DPI
+            coarse_dpi = None
+
+    if coarse_dpi:
+        page_data["image"] = render_page(page, coarse_dpi, grayscale=grayscale, pool=pool)
+        page_data["dpi"] = coarse_dpi
+        page_data["fine_dpi"] = dpi
+        page_data["pdf_page"] = page
+        return page_data
+
+    page_data["image"] = render_page(page, dpi, grayscale=grayscale, pool=pool)
+    if keep_pdf_page:
+        page_data["pdf_page"] = page
+    return page_data
+
+
+def iter_pdf_pages(pdf_path, dpi=300, use_text_layer=False, text_layer_min_words=20,
+                   page_numbers=None, skip_blank_pages=False, coarse_dpi=None,
+                   keep_pdf_page=False, embedded_images=False, grayscale=False, pool=None,
+                   adaptive_dpi=False):
+    """
+    Render pages lazily, one at a time.
+
+    Only the page currently being processed is held in memory, so peak
+    usage does not grow with the page count. `page_numbers` (1-based)
+    restricts loading to a subset of pages.
+    """
+    doc = open_pdf(pdf_path)
+
+    try:
+        if page_numbers is None:
+            page_numbers = range(1, len(doc) + 1)
+
+        for page_num in page_numbers:
+            yield load_page(
+                doc[page_num - 1],
+                dpi=dpi,
+                use_text_layer=use_text_layer,
+                text_layer_min_words=text_layer_min_words,
+                skip_blank_pages=skip_blank_pages,
+                coarse_dpi=coarse_dpi,
+                keep_pdf_page=keep_pdf_page,
+                embedded_images=embedded_images,
+                grayscale=grayscale,
+                pool=pool,
+                adaptive_dpi=adaptive_dpi
+            )
+    finally:
+        doc.close()
+
+
+def pdf_to_images(pdf_path, dpi=300):
+    return list(iter_pdf_pages(pdf_path, dpi=dpi))
@@ -0,0 +1,612 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+import pytesseract
+
+from ocr.pdf_loader import (
+    iter_pdf_pages, load_page, count_pages, render_page, ThreadDocuments
+)
+from ocr.image_preprocessor import preprocess_image, preprocess_settings
+from ocr.word_blocks import (
+    extract_word_table, extract_region_word_table, build_text_layer_word_table
+)
+from ocr.text_regions import find_text_regions, use_regions, region_settings
+from ocr.coarse_to_fine import coarse_to_fine_word_table, coarse_settings
+from ocr.word_refinement import refine_weak_words, refine_settings
+from ocr.deskew import detect_page_rotation, rotate_page, deskew_settings
+from ocr.adaptive_dpi import adaptive_dpi_settings
+from ocr.page_model import WordTable
+from ocr.line_blocks import build_line_blocks
+from ocr.section_blocks import build_section_blocks
+from ocr.table_blocks import extract_tables, build_table_blocks
+from ocr.block_factory import create_block, page_id_scope, set_id_format, get_id_format
+from ocr.form_parser import build_form_blocks
+from ocr.tesseract_engine import (
+    configure_engine, prepare_engine, get_engine, get_engine_settings
+)
+from ocr.ocr_cache import OcrCache
+from ocr.instrumentation import Profiler, timed
+from ocr.raster_buffers import page_buffers
+from ocr.staged_pipeline import Stage, iter_stages, MAX_IN_FLIGHT
+
+
+def _preprocess_and_ocr(page, engine=None, profile=None, ocr_options=None):
+    ocr_options = ocr_options or {}
+    if engine is None or isinstance(engine, str):
+        engine = get_engine(engine)
+
+    words = _ocr_words(page, engine, profile, ocr_options)
+
+    # Two line crops per weak line: only worth it with an in-process
+    # engine, as for text regions
+    if ocr_options.get("refine_words") and getattr(engine, "in_process", False):
+        with timed(profile, "refine_words"):
+            words = refine_weak_words(
+                words, page, engine, profile, executor=ocr_options.get("region_executor")
+            )
+
+    return words
+
+
+def _straighten_page(page, profile):
+    """Turn the page raster by its detected rotation (see deskew), once, before OCR."""
+    orientation, skew = page["rotation"]
+    if not orientation and not skew:
+        return
+
+    with timed(profile, "rotate"):
+        if page.get("fine_dpi") is not None:
+            # Coarse-to-fine clips come from the unrotated PDF page, so a
+            # rotated page is rendered whole at the full DPI instead
+            image = render_page(
+                page["pdf_page"], page["fine_dpi"],
+                grayscale=page["image"].ndim == 2, pool=page_buffers
+            )
+            page_buffers.release(page["image"])
+            page["image"] = image
+            page["dpi"] = page.pop("fine_dpi")
+
+        rotated = rotate_page(page["image"], orientation, skew, pool=page_buffers)
+        page_buffers.release(page["image"])
+        page["image"] = rotated
+
+    # Regions re-rendered from the PDF would not line up any more
+    page["pdf_page"] = None
+
+
+def _ocr_words(page, engine, profile, ocr_options):
+    if page.get("rotation") is not None:
+        _straighten_page(page, profile)
+
+    if page.get("fine_dpi") is not None:
+        # Loaded at a coarse DPI; fine print is re-rendered region by region
+        return coarse_to_fine_word_table(
+            page, engine, profile, executor=ocr_options.get("region_executor")
+        )
+
+    # The binarized page lives in a pooled buffer, reused by later pages
+    shape = page["image"].shape[:2]
+    with timed(profile, "preprocess"):
+        image = preprocess_image(page["image"], out=page_buffers.acquire(shape))
+
+    try:
+        return _ocr_binary(image, page, engine, profile, ocr_options)
+    finally:
+        page_buffers.release(image)
+
+
+def _ocr_binary(image, page, engine, profile, ocr_options):
+    page_num = page["page_number"]
+
+    # Every region is a Tesseract call of its own: cheap with an in-process
+    # engine, a subprocess each (slower than one full-page call) with the CLI
+    if ocr_options.get("text_regions") and getattr(engine, "in_process", False):
+        with timed(profile, "text_regions"):
+            regions = find_text_regions(image, scale=page.get("dpi", 300) / 300)
+
+        # Mostly-text pages gain nothing from cropping, and regions that
+        # miss most of the ink would drop text; both are OCR-ed whole
+        if use_regions(regions, image):
+            if profile is not None:
+                profile.count("regions", len(regions))
+                profile.count("ocr_pixels", sum(
+                    (x1 - x0) * (y1 - y0) for x0, y0, x1, y1, _ in regions
+                ))
+
+            with timed(profile, "ocr"):
+                return extract_region_word_table(
+                    image, page_num, regions, engine,
+                    executor=ocr_options.get("region_executor")
+                )
+
+    if profile is not None:
+        profile.count("ocr_pixels", image.shape[0] * image.shape[1])
+
+    with timed(profile, "ocr"):
+        return extract_word_table(image, page_num, engine)
+
+
+def ocr_page_words(page, cache=None, profile=None, ocr_options=None):
+    """
+    OCR a rendered page into a WordTable, going through `cache` (an
+    OcrCache) when one is given.
+
+    `ocr_options`: {"text_regions": bool, "region_executor": a thread
+    pool or None, "refine_words": bool, "deskew": bool}; with
+    text_regions only the detected text regions are sent to Tesseract,
+    with refine_words lines holding low-confidence words are re-OCR-ed
+    (see word_refinement); both only when the engine runs in-process. Region and
+    line crops are read on region_executor's threads when one is given.
+    A page["rotation"] set by process_page (with deskew) is corrected
+    before OCR. Pages loaded with a coarse DPI always go through the
+    two-pass coarse_to_fine OCR. Pages whose DPI was chosen per page
+    (page["adaptive_dpi"]) are cached under the adaptive_dpi settings.
+    """
+    page_num = page["page_number"]
+
+    if cache is None:
+        return _preprocess_and_ocr(page, profile=profile, ocr_options=ocr_options)
+
+    with timed(profile, "cache_lookup"):
+        engine = get_engine()
+
+        settings = {"preprocess": preprocess_settings()}
+        if page.get("fine_dpi") is not None:
+            settings["regions"] = region_settings()
+            settings["coarse_to_fine"] = coarse_settings(page["dpi"], page["fine_dpi"])
+        elif ocr_options and ocr_options.get("text_regions"):
+            settings["regions"] = region_settings()
+        if (ocr_options and ocr_options.get("refine_words")
+                and getattr(engine, "in_process", False)):
+            settings["refine"] = refine_settings()
+        if ocr_options and ocr_options.get("deskew"):
+            settings["deskew"] = deskew_settings()
+        if page.get("adaptive_dpi"):
+            settings["adaptive_dpi"] = adaptive_dpi_settings()
+
+        key = cache.make_key(
+            page["image"],
+            dpi=page.get("dpi"),
+            lang=engine.lang,
+            engine=engine.name,
+            **settings
+        )
+        word_blocks = cache.get(key, page_num)
+
+    if word_blocks is None:
+        words = _preprocess_and_ocr(page, engine, profile, ocr_options)
+        cache.put(key, words.to_blocks())
+        return words
+
+    if profile is not None:
+        profile.count("cache_hits", 1)
+
+    return WordTable.from_blocks(word_blocks, page_num)
+
+
+def process_page(page, cache=None, profile=None, ocr_options=None):
+    """
+    Run the full block pipeline for a single rendered page and return
+    its blocks in output order. `profile` (a PageProfile) receives
+    per-stage timings and counts; `ocr_options` are passed to
+    ocr_page_words.
+    """
+    with page_id_scope(page["page_number"]):
+        return _process_page(page, cache, profile, ocr_options)
+
+
+def _process_page(page, cache, profile, ocr_options):
+    page_block, words = _read_page(page, cache, profile, ocr_options)
+    return _finish_page(page_block, words, profile)
+
+
+def _read_page(page, cache, profile, ocr_options):
+    """
+    Render-to-words half of process_page: the page's PAGE block and its
+    WordTable (None for skipped pages).
+    """
+    page_num = page["page_number"]
+
+    if page.get("skipped") is not None:
+        # Nothing to read; the PAGE block keeps page numbering intact
+        if profile is not None:
+            profile.count("skipped_pages", 1)
+        return create_block("PAGE", Page=page_num, TextSource="NONE", Skipped=page["skipped"]), None
+
+    if page.get("text_words") is not None:
+        # Born-digital page: the PDF text layer replaces Tesseract
+        page_block = create_block("PAGE", Page=page_num, TextSource="TEXT_LAYER")
+        with timed(profile, "text_layer"):
+            words = build_text_layer_word_table(page["text_words"], page_num)
+    else:
+        page_block = create_block("PAGE", Page=page_num, TextSource="OCR")
+        if page.get("adaptive_dpi"):
+            page_block["Dpi"] = page.get("fine_dpi") or page["dpi"]
+        if profile is not None:
+            profile.count("pixels", page["image"].shape[0] * page["image"].shape[1])
+
+        if ocr_options and ocr_options.get("deskew"):
+            # Detected on a shrunk copy; the page is only turned (once)
+            # when its OCR is not cached
+            with timed(profile, "deskew"):
+                page["rotation"] = detect_page_rotation(page["image"])
+            page_block["Orientation"], page_block["Skew"] = page["rotation"]
+
+        words = ocr_page_words(page, cache, profile, ocr_options)
+
+    return page_block, words
+
+
+def _finish_page(page_block, words, profile):
+    if words is None:
+        return [page_block]
+    return build_page_blocks(page_block, words, profile)
+
+
+def build_page_blocks(page_block, words, profile=None):
+    """
+    Post-processing half of the pipeline: build LINE/PARAGRAPH, form,
+    section and table blocks from a page's words (a WordTable or WORD
+    blocks). Usable on its own to replay saved word blocks without
+    rendering or OCR.
+
+    The heuristics run on the columnar WordTable; WORD dicts are only
+    materialized here, when the page's blocks are assembled for output.
+    """
+    words = WordTable.of(words)
+
+    with timed(profile, "lines"):
+        line_blocks, paragraph_blocks = build_line_blocks(words)
+
+    with timed(profile, "forms"):
+        form_blocks = build_form_blocks(line_blocks, words)
+
+    with timed(profile, "sections"):
+        section_blocks = build_section_blocks(line_blocks)
+
+    with timed(profile, "tables"):
+        table_lines = extract_tables(line_blocks)
+        table_blocks = build_table_blocks(table_lines)
+
+    # Best order for readable_formatter output
+    blocks = [page_block]
+    blocks.extend(section_blocks)
+    blocks.extend(form_blocks)
+    blocks.extend(table_blocks)
+    blocks.extend(paragraph_blocks)
+    blocks.extend(line_blocks)
+
+    with timed(profile, "serialize_words"):
+        blocks.extend(words.to_blocks())
+
+    if profile is not None:
+        profile.count("words", len(words))
+        profile.count("lines", len(line_blocks))
+        profile.count("blocks", len(blocks))
+
+    return blocks
+
+
+def _iter_processed_pages(pdf_path, page_numbers=None, cache=None, profiler=None,
+                          ocr_options=None, **load_options):
+    pages = iter_pdf_pages(
+        pdf_path, page_numbers=page_numbers, pool=page_buffers, **load_options
+    )
+
+    # Region and line crops of a page are read concurrently on this
+    # document's own pool; its threads keep their engines warm across pages
+    ocr_options = dict(ocr_options or {})
+    threads = ocr_options.get("region_threads", 1)
+    executor = None
+    if threads > 1:
+        executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="ocr-region")
+    ocr_options["region_executor"] = executor
+
+    try:
+        while True:
+            # The loader renders lazily, so time the fetch itself
+            profile = profiler.page(None) if profiler is not None else None
+            with timed(profile, "load"):
+                page = next(pages, None)
+
+            if page is None:
+                return
+
+            page_num = page["page_number"]
+            blocks = process_page(page, cache, profile, ocr_options)
+
+            page_buffers.release(page.get("image"))
+            page.clear()
+
+            if profile is not None:
+                profile.page_number = page_num
+                profiler.add_page(profile.to_dict())
+
+            yield page_num, blocks
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+def _init_worker(tesseract_cmd, engine_settings, id_format):
+    # Spawned workers don't run main/config, so carry the binary path,
+    # engine choice and id format over
+    pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+    configure_engine(**engine_settings)
+    set_id_format(id_format)
+
+
+def _process_page_chunk(pdf_path, page_numbers, load_options, ocr_options, cache_options,
+                        profile):
+    # Each worker opens the document itself; only blocks, cache counters
+    # and page profiles cross processes
+    cache = OcrCache(**cache_options) if cache_options else None
+    profiler = Profiler() if profile else None
+
+    results = list(_iter_processed_pages(
+        pdf_path, page_numbers, cache, profiler, ocr_options, **load_options
+    ))
+
+    return {
+        "pages": results,
+        "cache_stats": cache.stats() if cache else None,
+        "profiles": profiler.pages if profiler else []
+    }
+
+
+def _iter_parallel_page_blocks(pdf_path, workers, load_options, ocr_options, cache=None,
+                               profiler=None, page_numbers=None):
+    if page_numbers is None:
+        page_numbers = range(1, count_pages(pdf_path) + 1)
+    page_numbers = sorted(page_numbers)
+    if not page_numbers:
+        return
+
+    # A few chunks per worker keeps the pool balanced when pages differ
+    # a lot in cost (text-layer pages vs. dense scans)
+    chunk_size = max(1, len(page_numbers) // (workers * 4))
+    chunks = [
+        page_numbers[start:start + chunk_size]
+        for start in range(0, len(page_numbers), chunk_size)
+    ]
+
+    def chunk_cache_options():
+        if cache is None:
+            return None
+        # Workers start from the parent's running total (updated as
+        # chunks report back) instead of each walking the cache
+        # directory; eviction rescans it anyway
+        return {
+            "cache_dir": cache.cache_dir,
+            "max_bytes": cache.max_bytes,
+            "size": cache.stats()["size_bytes"]
+        }
+
+    # Chunks are only submitted once an earlier one has been yielded, so
+    # finished chunks waiting for their turn never hold more than this
+    # many chunks' blocks
+    max_pending = workers * 2
+
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(chunks)),
+        initializer=_init_worker,
+        initargs=(
+            pytesseract.pytesseract.tesseract_cmd,
+            get_engine_settings(),
+            get_id_format()
+        )
+    ) as pool:
+        chunks = iter(chunks)
+        pending = deque()
+
+        # Chunks are contiguous, so yielding futures in submission order
+        # keeps pages in document order; ids are page-scoped, so they match
+        # a serial run
+        while True:
+            for chunk in chunks:
+                pending.append(pool.submit(
+                    _process_page_chunk, pdf_path, chunk, load_options, ocr_options,
+                    chunk_cache_options(), profiler is not None
+                ))
+                if len(pending) >= max_pending:
+                    break
+            if not pending:
+                break
+
+            chunk_result = pending.popleft().result()
+
+            if chunk_result["cache_stats"]:
+                cache.add_stats(chunk_result["cache_stats"])
+            for page_record in chunk_result["profiles"]:
+                profiler.add_page(page_record)
+
+            yield from chunk_result["pages"]
+
+
+def _load_stage(docs, profiler, load_options, page_num):
+    profile = profiler.page(page_num) if profiler is not None else None
+    with timed(profile, "load"):
+        page = load_page(docs.get()[page_num - 1], pool=page_buffers, **load_options)
+    return page, profile
+
+
+def _read_stage(docs, cache, ocr_options, loaded):
+    page, profile = loaded
+    page_num = page["page_number"]
+
+    if page.get("pdf_page") is not None:
+        # The loading thread's document is busy with later pages; regions
+        # are re-rendered from this thread's own copy
+        page["pdf_page"] = docs.get()[page_num - 1]
+
+    with page_id_scope(page_num) as ids:
+        page_block, words = _read_page(page, cache, profile, ocr_options)
+
+    page_buffers.release(page.get("image"))
+    page.clear()
+    return page_num, page_block, words, ids, profile
+
+
+def _finish_stage(read):
+    # Runs in a thread or a post-processing process; the page's id
+    # numbering carries on from the OCR stage
+    page_num, page_block, words, ids, profile = read
+    with page_id_scope(page_num, ids):
+        blocks = _finish_page(page_block, words, profile)
+    return page_num, blocks, profile
+
+
+def _iter_staged_page_blocks(pdf_path, stages, load_options, ocr_options, cache=None,
+                             profiler=None, page_numbers=None):
+    if page_numbers is None:
+        page_numbers = range(1, count_pages(pdf_path) + 1)
+
+    # OCR threads create their engines on first use; the backend has to
+    # be resolved and imported on this thread first (see prepare_engine)
+    prepare_engine()
+
+    post_processes = stages.get("post_processes", 0)
+    docs = ThreadDocuments(pdf_path)
+
+    pipeline = [
+        Stage(
+            "load", partial(_load_stage, docs, profiler, load_options),
+            workers=stages.get("render_threads", 1)
+        ),
+        Stage(
+            "ocr", partial(_read_stage, docs, cache, ocr_options),
+            workers=stages.get("ocr_threads", 1)
+        ),
+        Stage(
+            "post", _finish_stage,
+            workers=post_processes or 1,
+            processes=post_processes > 0,
+            initializer=_init_worker,
+            initargs=(
+                pytesseract.pytesseract.tesseract_cmd,
+                get_engine_settings(),
+                get_id_format()
+            )
+        )
+    ]
+
+    try:
+        for page_num, blocks, profile in iter_stages(
+            page_numbers, pipeline, stages.get("max_in_flight", MAX_IN_FLIGHT)
+        ):
+            if profile is not None:
+                profiler.add_page(profile.to_dict())
+            yield page_num, blocks
+    finally:
+        docs.close()
+
+
+def iter_page_blocks(pdf_path, dpi=300, use_text_layer=False, text_layer_min_words=20,
+                     workers=1, cache=None, profiler=None, page_numbers=None,
+                     skip_blank_pages=False, text_regions=False, region_threads=1,
+                     coarse_dpi=None, refine_words=False, embedded_images=False,
+                     grayscale=False, deskew=False, adaptive_dpi=False, stages=None):
+    """
+    Stream (page_number, blocks) pairs, rendering and OCR-ing one page at
+    a time. The page raster is released before its blocks are yielded.
+
+    With `use_text_layer`, born-digital pages are read from the PDF text
+    layer and only scanned pages are sent to Tesseract.
+
+    With `workers` > 1 (None = one per CPU), pages are processed in a
+    process pool and merged back in page order.
+
+    With an OcrCache as `cache`, previously seen pages skip preprocessing
+    and Tesseract; workers share its directory and their hit/miss counts
+    are folded back into it.
+
+    With a Profiler as `profiler`, every page's stage timings and counts
+    are recorded into it (including pages processed by workers).
+
+    `page_numbers` (1-based) restricts processing to those pages, e.g.
+    the ones a resumed batch run has not finished yet.
+
+    With `skip_blank_pages`, blank scans are detected on a low-res probe
+    and emitted as a bare PAGE block with a Skipped reason, without
+    rendering or OCR.
+
+    With `text_regions` and an in-process engine (tesserocr), Tesseract
+    only sees the text regions found on the binarized page, unless they
+    cover most of it or miss most of its ink. Region and line crops are
+    read on a pool of `region_threads` threads kept for the document.
+
+    With `coarse_dpi`, scanned pages are rendered at that DPI first and
+    only their finer print is re-rendered, region by region, at up to
+    `dpi` (see coarse_to_fine).
+
+    With `refine_words`, lines holding low-confidence OCR words are
+    re-rendered at a higher resolution and re-OCR-ed, keeping the better
+    reading (see word_refinement); only with an in-process engine.
+
+    With `embedded_images`, plain scans (a single full-page image) are
+    OCR-ed from the decoded image at its native resolution instead of a
+    `dpi` render (see embedded_images).
+
+    With `grayscale`, pages are rendered single-channel. Page rasters and
+    their binarized copies always go through reusable pooled buffers
+    (see raster_buffers), so steady-state pages allocate no full-page
+    arrays of their own.
+
+    With `deskew`, each OCR-ed page's orientation (quarter turns) and
+    skew are estimated on a shrunk copy and the raster is turned upright
+    once before OCR; the PAGE block records them as Orientation and Skew
+    (counterclockwise degrees) and the page's block geometry refers to
+    the straightened page.
+
+    With `adaptive_dpi`, `dpi` is only the fallback: each rendered page
+    is probed at a low resolution and rendered at the DPI that brings its
+    text to the glyph height Tesseract reads best (see adaptive_dpi); the
+    PAGE block of every OCR-ed page records its DPI as Dpi.
+
+    With `stages` (and a single worker), pages go through a staged
+    pipeline instead of one at a time (see staged_pipeline): loading, OCR
+    and post-processing of consecutive pages overlap. `stages` is a dict
+    of {"render_threads": int, "ocr_threads": int, "post_processes": int
+    (0 = one thread), "max_in_flight": int}; each render and OCR thread
+    opens its own copy of the PDF, and at most max_in_flight pages are
+    held between the stages. Output is the same as a serial run. The OCR
+    threads read their pages' crops themselves (`region_threads` is not
+    used).
+    """
+    load_options = {
+        "dpi": dpi,
+        "use_text_layer": use_text_layer,
+        "text_layer_min_words": text_layer_min_words,
+        "skip_blank_pages": skip_blank_pages,
+        "coarse_dpi": coarse_dpi,
+        "keep_pdf_page": refine_words,
+        "embedded_images": embedded_images,
+        "grayscale": grayscale,
+        "adaptive_dpi": adaptive_dpi
+    }
+    ocr_options = {
+        "text_regions": text_regions,
+        "region_threads": region_threads,
+        "refine_words": refine_words,
+        "deskew": deskew
+    }
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers > 1:
+        return _iter_parallel_page_blocks(
+            pdf_path, workers, load_options, ocr_options, cache, profiler, page_numbers
+        )
+
+    if stages:
+        return _iter_staged_page_blocks(
+            pdf_path, stages, load_options, ocr_options, cache, profiler, page_numbers
+        )
+
+    return _iter_processed_pages(
+        pdf_path, page_numbers, cache=cache, profiler=profiler, ocr_options=ocr_options,
+        **load_options
+    )
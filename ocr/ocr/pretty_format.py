@@ -1,15 +1,16 @@
 import json
 
+from ocr.block_index import BlockIndex
+
 
 def get_lines_in_reading_order(blocks, page_number):
     """
     Extract LINE blocks for a page and return their text
     in top-to-bottom, left-to-right order.
+
+    `blocks` may be a block list or a BlockIndex.
     """
-    lines = [
-        b for b in blocks
-        if b.get("BlockType") == "LINE" and b.get("Page") == page_number
-    ]
+    lines = list(BlockIndex.of(blocks).of_type("LINE", page_number))
 
     lines.sort(
         key=lambda l: (
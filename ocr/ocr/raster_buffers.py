@@ -0,0 +1,60 @@
+import threading
+import weakref
+
+import numpy as np
+
+# Free buffers kept per page shape; a staged pipeline holds a few pages
+# in flight at once
+MAX_FREE_PER_SHAPE = 4
+
+
+class BufferPool:
+    """
+    Reusable uint8 page buffers, keyed by shape. Page rasters and their
+    binarized copies are the same few shapes for a whole document, so
+    after the first pages no full-page array has to be allocated.
+
+    acquire() hands out a buffer that nobody else holds until it is
+    release()-d; releasing an array the pool did not hand out is a no-op,
+    so callers can release whatever raster a page ended up with. Buffers
+    that are dropped without being released are simply garbage collected.
+    """
+
+    def __init__(self, max_free_per_shape=MAX_FREE_PER_SHAPE):
+        self.max_free_per_shape = max_free_per_shape
+        self._free = {}
+        self._in_use = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+        self.allocations = 0
+        self.reuses = 0
+
+    def acquire(self, shape):
+        shape = tuple(shape)
+        with self._lock:
+            free = self._free.get(shape)
+            if free:
+                buffer = free.pop()
+                self.reuses += 1
+            else:
+                buffer = np.empty(shape, dtype=np.uint8)
+                self.allocations += 1
+            self._in_use[id(buffer)] = buffer
+        return buffer
+
+    def release(self, buffer):
+        if buffer is None:
+            return
+        with self._lock:
+            if self._in_use.get(id(buffer)) is not buffer:
+                return
+            del self._in_use[id(buffer)]
+            free = self._free.setdefault(buffer.shape, [])
+            if len(free) < self.max_free_per_shape:
+                free.append(buffer)
+
+    def stats(self):
+        return {"allocations": self.allocations, "reuses": self.reuses}
+
+
+# Process-wide pool used by the page loader and preprocessing
+page_buffers = BufferPool()
@@ -1,8 +1,12 @@
 import json
 
+from ocr.block_index import BlockIndex
+
 
 def format_readable_output(blocks, page_number):
-    """Enhanced formatter with form field support"""
+    """Enhanced formatter with form field support (`blocks` may be a BlockIndex)"""
+    index = BlockIndex.of(blocks)
+
     output_lines = []
     output_lines.append("=" * 80)
     output_lines.append(f"PAGE {page_number}")
@@ -10,28 +14,11 @@ def format_readable_output(blocks, page_number):
     output_lines.append("")
     
     # Get different block types for this page
-    sections = [b for b in blocks 
-                if b.get("BlockType") == "SECTION" 
-                and b.get("Page") == page_number]
-    
-    form_fields = [b for b in blocks 
-                   if b.get("BlockType") == "FORM_FIELD" 
-                   and b.get("Page") == page_number]
-    
-    kv_pairs = [b for b in blocks 
-                if b.get("BlockType") == "KEY_VALUE_SET" 
-                and b.get("Page") == page_number]
-    
-    checkboxes = [b for b in blocks 
-                  if b.get("BlockType") == "CHECKBOX" 
-                  and b.get("Page") == page_number]
-    
-    lines = [b for b in blocks if b.get("BlockType") == "LINE"]
-    line_dict = {l["Id"]: l for l in lines}
-    
-    tables = [b for b in blocks 
-              if b.get("BlockType") == "TABLE" 
-              and b.get("Page") == page_number]
+    sections = index.of_type("SECTION", page_number)
+    form_fields = index.of_type("FORM_FIELD", page_number)
+    kv_pairs = index.of_type("KEY_VALUE_SET", page_number)
+    checkboxes = index.of_type("CHECKBOX", page_number)
+    tables = index.of_type("TABLE", page_number)
     
     # Display form fields WITH VALUES
     if form_fields:
@@ -91,17 +78,14 @@ def format_readable_output(blocks, page_number):
             output_lines.append("-" * len(section["Title"]))
             output_lines.append("")
             
-            if "Relationships" in section and section["Relationships"]:
-                line_ids = section["Relationships"][0].get("Ids", [])
-                for line_id in line_ids:
-                    if line_id in line_dict:
-                        output_lines.append(f"  {line_dict[line_id]['Text']}")
+            for line in index.children(section, "LINE"):
+                output_lines.append(f"  {line['Text']}")
             
             output_lines.append("")
     
     # If no sections, print all lines
     if not sections and not form_fields:
-        page_lines = [l for l in lines if l.get("Page") == page_number]
+        page_lines = list(index.of_type("LINE", page_number))
         page_lines.sort(key=lambda x: (
             x["Geometry"]["BoundingBox"]["Top"],
             x["Geometry"]["BoundingBox"]["Left"]
@@ -120,9 +104,7 @@ def format_readable_output(blocks, page_number):
             output_lines.append(f"\nTable {table_idx}:")
             output_lines.append("")
             
-            cells = [b for b in blocks 
-                    if b.get("BlockType") == "CELL" 
-                    and b["Id"] in table["Relationships"][0]["Ids"]]
+            cells = index.children(table, "CELL")
             
             # Organize cells into rows
             rows_dict = {}
@@ -166,7 +148,9 @@ def format_readable_output(blocks, page_number):
 
 
 def create_structured_json(blocks, page_number):
-    """Enhanced structured JSON with form fields"""
+    """Enhanced structured JSON with form fields (`blocks` may be a BlockIndex)"""
+    index = BlockIndex.of(blocks)
+
     result = {
         "page": page_number,
         "sections": [],
@@ -177,12 +161,7 @@ def create_structured_json(blocks, page_number):
     }
     
     # Extract sections
-    sections = [b for b in blocks 
-                if b.get("BlockType") == "SECTION" 
-                and b.get("Page") == page_number]
-    
-    lines = [b for b in blocks if b.get("BlockType") == "LINE"]
-    line_dict = {l["Id"]: l for l in lines}
+    sections = index.of_type("SECTION", page_number)
     
     for section in sections:
         section_data = {
@@ -190,23 +169,17 @@ def create_structured_json(blocks, page_number):
             "content": []
         }
         
-        if "Relationships" in section and section["Relationships"]:
-            line_ids = section["Relationships"][0].get("Ids", [])
-            for line_id in line_ids:
-                if line_id in line_dict:
-                    line = line_dict[line_id]
-                    section_data["content"].append({
-                        "text": line["Text"],
-                        "confidence": line.get("Confidence", 0),
-                        "bbox": line["Geometry"]["BoundingBox"]
-                    })
+        for line in index.children(section, "LINE"):
+            section_data["content"].append({
+                "text": line["Text"],
+                "confidence": line.get("Confidence", 0),
+                "bbox": line["Geometry"]["BoundingBox"]
+            })
         
         result["sections"].append(section_data)
     
     # Extract form fields WITH VALUES
-    form_fields = [b for b in blocks 
-                   if b.get("BlockType") == "FORM_FIELD" 
-                   and b.get("Page") == page_number]
+    form_fields = index.of_type("FORM_FIELD", page_number)
     
     for field in form_fields:
         result["form_fields"].append({
@@ -217,9 +190,7 @@ def create_structured_json(blocks, page_number):
         })
     
     # Extract key-value pairs
-    kv_pairs = [b for b in blocks 
-                if b.get("BlockType") == "KEY_VALUE_SET" 
-                and b.get("Page") == page_number]
+    kv_pairs = index.of_type("KEY_VALUE_SET", page_number)
     
     for kv in kv_pairs:
         result["key_value_pairs"].append({
@@ -229,9 +200,7 @@ def create_structured_json(blocks, page_number):
         })
     
     # Extract checkboxes WITH STATE
-    checkboxes = [b for b in blocks 
-                  if b.get("BlockType") == "CHECKBOX" 
-                  and b.get("Page") == page_number]
+    checkboxes = index.of_type("CHECKBOX", page_number)
     
     for cb in checkboxes:
         result["checkboxes"].append({
@@ -242,14 +211,10 @@ def create_structured_json(blocks, page_number):
         })
     
     # Extract tables
-    tables = [b for b in blocks 
-              if b.get("BlockType") == "TABLE" 
-              and b.get("Page") == page_number]
+    tables = index.of_type("TABLE", page_number)
     
     for table in tables:
-        cells = [b for b in blocks 
-                if b.get("BlockType") == "CELL" 
-                and b["Id"] in table["Relationships"][0]["Ids"]]
+        cells = index.children(table, "CELL")
         
         table_data = {"rows": [], "has_header": True}
         rows_dict = {}
@@ -276,32 +241,38 @@ def create_structured_json(blocks, page_number):
 
 def save_readable_output(blocks, output_path):
     """Save enhanced outputs"""
-    pages = set()
-    for block in blocks:
-        if "Page" in block:
-            pages.add(block["Page"])
+    # Index once for the whole document; every per-page formatter reuses it
+    index = BlockIndex.of(blocks)
+    pages = index.pages
     
     if not pages:
         print("Warning: No pages found in blocks!")
         return
     
-    # Save text output
-    text_output = []
-    for page_num in sorted(pages):
-        text_output.append(format_readable_output(blocks, page_num))
-        text_output.append("\n\n")
-    
+    save_readable_pages(((page_num, index) for page_num in pages), output_path)
+
+
+def save_readable_pages(pages, output_path):
+    """
+    Save enhanced outputs from (page_number, blocks) pairs, one page in
+    memory at a time (e.g. NdjsonBlockReader.iter_pages())
+    """
     text_path = output_path.replace('.json', '_readable.txt')
+    json_path = output_path.replace('.json', '_structured.json')
+    json_output = {"pages": []}
+    
+    # Text output is written as it is formatted; structured pages are small
     with open(text_path, 'w', encoding='utf-8') as f:
-        f.write("\n".join(text_output))
+        for i, (page_num, blocks) in enumerate(pages):
+            index = BlockIndex.of(blocks)
+            if i:
+                f.write("\n")
+            f.write(format_readable_output(index, page_num))
+            f.write("\n\n\n")
+            json_output["pages"].append(create_structured_json(index, page_num))
     print(f"✅ Saved readable text to: {text_path}")
     
     # Save structured JSON
-    json_output = {"pages": []}
-    for page_num in sorted(pages):
-        json_output["pages"].append(create_structured_json(blocks, page_num))
-    
-    json_path = output_path.replace('.json', '_structured.json')
     with open(json_path, 'w', encoding='utf-8') as f:
         json.dump(json_output, f, indent=2, ensure_ascii=False)
     print(f"✅ Saved structured JSON to: {json_path}")
\ No newline at end of file
@@ -0,0 +1,87 @@
+import numpy as np
+
+from ocr.page_model import WordTable
+
+
+class WordIndex:
+    """
+    Per-page index over WORD bounding boxes.
+
+    Words are kept sorted by Top, so band queries ("words within Y of this
+    line") are a binary search plus a vectorized filter over the words
+    inside the band, instead of a pass over the whole page. Query results
+    are word indices in the page's original word order, so callers that
+    sort afterwards get the same tie-breaking as a full scan.
+    """
+
+    # Slack added around searched bands; the exact predicates are applied
+    # to the candidates afterwards
+    EPSILON = 1e-9
+
+    def __init__(self, words):
+        self.table = WordTable.of(words)
+        self.texts = self.table.texts
+
+        self.lefts = self.table.left
+        self.tops = self.table.top
+
+        self._order = np.argsort(self.tops, kind="stable")
+        self._sorted_tops = self.tops[self._order]
+        self._flags = {}
+
+    def __len__(self):
+        return len(self.table)
+
+    def flags(self, predicate):
+        """Evaluate `predicate(text)` once per word and cache the result."""
+        cached = self._flags.get(predicate)
+        if cached is None:
+            cached = [predicate(text) for text in self.texts]
+            self._flags[predicate] = cached
+        return cached
+
+    def in_band(self, top_min, top_max):
+        """Indices of words whose Top lies in [top_min, top_max] (± epsilon)."""
+        start = np.searchsorted(self._sorted_tops, top_min - self.EPSILON, side="left")
+        end = np.searchsorted(self._sorted_tops, top_max + self.EPSILON, side="right")
+        return np.sort(self._order[start:end])
+
+    def right_of(self, left_min, left_max, top, band):
+        """Words starting strictly between left_min and left_max, within `band` of `top`."""
+        candidates = self.in_band(top - band, top + band)
+        lefts = self.lefts[candidates]
+        mask = (
+            (lefts > left_min)
+            & (lefts < left_max)
+            & (np.abs(self.tops[candidates] - top) < band)
+        )
+        return candidates[mask].tolist()
+
+    def below(self, bottom, max_gap, left, max_offset):
+        """Words starting within `max_gap` under `bottom`, left-aligned within `max_offset`."""
+        candidates = self.in_band(bottom, bottom + max_gap)
+        tops = self.tops[candidates]
+        mask = (
+            (tops > bottom)
+            & (tops < bottom + max_gap)
+            & (np.abs(self.lefts[candidates] - left) < max_offset)
+        )
+        return candidates[mask].tolist()
+
+
+def build_page_word_indexes(words):
+    """
+    Index each page once. Takes a single page's WordTable or a list of
+    WORD blocks (grouped by their Page).
+    """
+    if isinstance(words, WordTable):
+        return {words.page_num: WordIndex(words)}
+
+    page_words = {}
+    for word in words:
+        page_words.setdefault(word.get("Page", 1), []).append(word)
+
+    return {
+        page: WordIndex(WordTable.from_blocks(page_list, page))
+        for page, page_list in page_words.items()
+    }
@@ -0,0 +1,171 @@
+import asyncio
+import multiprocessing
+import queue
+import threading
+from contextlib import aclosing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+# Items between the first stage's input and the ordered output at once;
+# the rest wait at the source, so memory stays bounded however unevenly
+# the stages run
+MAX_IN_FLIGHT = 4
+
+
+class Stage:
+    """
+    One step of a staged pipeline: `func(item)` returns the item handed to
+    the next stage. It runs on `workers` threads (I/O-bound work, or
+    libraries that release the GIL: Tesseract, OpenCV, PyMuPDF), or on
+    `workers` processes with `processes` (pure-Python CPU work; `func`,
+    items and results must then be picklable, and `initializer(*initargs)`
+    sets each process up).
+    """
+
+    def __init__(self, name, func, workers=1, processes=False, initializer=None, initargs=()):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.processes = processes
+        self.initializer = initializer
+        self.initargs = initargs
+
+    def executor(self):
+        if self.processes:
+            # Workers start while the pipeline's threads are running, and
+            # forking a multi-threaded process can deadlock the child
+            return ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=self.initializer, initargs=self.initargs
+            )
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.name)
+
+
+async def run_stages(items, stages, max_in_flight=MAX_IN_FLIGHT):
+    """
+    Push every item of `items` through `stages` (Stage list) and yield
+    the last stage's results in input order.
+
+    Stages are connected by bounded asyncio queues, so while one item is
+    in stage N the next one is already in stage N - 1; with enough
+    workers per stage, throughput approaches that of the slowest stage
+    instead of the sum of all of them. At most `max_in_flight` items are
+    between the source and the consumer at once (backpressure): an item
+    is only taken from `items` once an earlier one has been yielded.
+
+    The first exception raised by a stage is re-raised here; closing the
+    generator early cancels the remaining work and waits for running
+    calls to finish.
+    """
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(max_in_flight)
+    inboxes = [asyncio.Queue(maxsize=max_in_flight) for _ in stages]
+    # (index, result, error); (None, item count, None) once the source is
+    # exhausted. Never holds more than max_in_flight items
+    done = asyncio.Queue()
+    executors = [stage.executor() for stage in stages]
+
+    async def feed():
+        count = 0
+        for index, item in enumerate(items):
+            await slots.acquire()
+            await inboxes[0].put((index, item))
+            count = index + 1
+        await done.put((None, count, None))
+
+    async def work(n):
+        stage, executor = stages[n], executors[n]
+        outbox = inboxes[n + 1] if n + 1 < len(stages) else None
+
+        while True:
+            index, item = await inboxes[n].get()
+            try:
+                result = await loop.run_in_executor(executor, stage.func, item)
+            except Exception as error:
+                await done.put((index, None, error))
+                continue
+
+            if outbox is not None:
+                await outbox.put((index, result))
+            else:
+                await done.put((index, result, None))
+
+    tasks = [asyncio.create_task(feed())]
+    for n, stage in enumerate(stages):
+        tasks.extend(asyncio.create_task(work(n)) for _ in range(stage.workers))
+
+    try:
+        finished = {}
+        next_index = 0
+        count = None
+
+        while count is None or next_index < count:
+            index, result, error = await done.get()
+            if error is not None:
+                raise error
+            if index is None:
+                count = result
+                continue
+
+            # Later items may finish first; hold them until it is their turn
+            finished[index] = result
+            while next_index in finished:
+                yield finished.pop(next_index)
+                next_index += 1
+                slots.release()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for executor in executors:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_stages(items, stages, max_in_flight=MAX_IN_FLIGHT):
+    """
+    run_stages() for synchronous callers: the event loop runs on a
+    background thread and results are handed over one at a time, so a
+    slow consumer holds the pipeline back instead of piling results up.
+    """
+    results = queue.Queue(maxsize=1)
+    runner = {}
+
+    async def pump():
+        runner["loop"] = asyncio.get_running_loop()
+        runner["task"] = asyncio.current_task()
+        try:
+            async with aclosing(run_stages(items, stages, max_in_flight)) as stage_results:
+                async for result in stage_results:
+                    await asyncio.to_thread(results.put, (True, result))
+        except asyncio.CancelledError:
+            # The consumer is gone; nobody is waiting for the rest
+            return
+        except Exception as error:
+            await asyncio.to_thread(results.put, (False, error))
+        else:
+            await asyncio.to_thread(results.put, (False, None))
+
+    thread = threading.Thread(target=asyncio.run, args=(pump(),), name="stages", daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            ok, value = results.get()
+            if not ok:
+                thread.join()
+                if value is not None:
+                    raise value
+                return
+            yield value
+    finally:
+        if thread.is_alive():
+            # Closed early: cancel the stages, unblocking any pending
+            # hand-over until the loop has shut down
+            try:
+                runner["loop"].call_soon_threadsafe(runner["task"].cancel)
+            except (KeyError, RuntimeError):
+                pass
+            while thread.is_alive():
+                try:
+                    results.get(timeout=0.05)
+                except queue.Empty:
+                    pass
@@ -63,7 +63,206 @@ def extract_words(image, lang="eng"):
 
     return words'''
 
+import threading
+
+import numpy as np
 import pytesseract
+from pytesseract import Output
 
 def extract_full_text(image, lang="eng"):
     return pytesseract.image_to_string(image, lang=lang)
+
+
+class PytesseractEngine:
+    """
+    Runs the tesseract CLI through pytesseract: one subprocess, temp
+    image file and model load per call.
+    """
+    name = "pytesseract"
+    in_process = False
+
+    def __init__(self, lang="eng"):
+        self.lang = lang
+
+    def image_to_data(self, image, psm=None):
+        config = f"--psm {psm}" if psm is not None else ""
+        return pytesseract.image_to_data(
+            image, lang=self.lang, config=config, output_type=Output.DICT
+        )
+
+
+class TesserocrEngine:
+    """
+    Keeps a Tesseract API instance loaded in-process (via tesserocr) and
+    feeds it NumPy buffers directly, so the model is loaded once and no
+    subprocess or temp file is involved.
+
+    A TessBaseAPI is not thread-safe; get_engine() hands out one instance
+    per thread.
+    """
+    name = "tesserocr"
+    in_process = True
+
+    def __init__(self, lang="eng"):
+        import tesserocr
+
+        self.lang = lang
+        self._tesserocr = tesserocr
+        self.api = tesserocr.PyTessBaseAPI(lang=lang)
+
+    def image_to_data(self, image, psm=None):
+        """
+        Same word-level keys as pytesseract's image_to_data(Output.DICT),
+        without the page/block/paragraph/line rows. `psm` overrides the
+        page segmentation mode for this call only.
+        """
+        RIL = self._tesserocr.RIL
+
+        image = np.ascontiguousarray(image)
+        height, width = image.shape[:2]
+        channels = 1 if image.ndim == 2 else image.shape[2]
+
+        buffer = image.tobytes()
+        self.api.SetImageBytes(buffer, width, height, channels, width * channels)
+
+        if psm is None:
+            self.api.Recognize()
+        else:
+            default_psm = self.api.GetPageSegMode()
+            self.api.SetPageSegMode(psm)
+            try:
+                self.api.Recognize()
+            finally:
+                self.api.SetPageSegMode(default_psm)
+
+        data = {key: [] for key in (
+            "level", "page_num", "block_num", "par_num", "line_num",
+            "word_num", "left", "top", "width", "height", "conf", "text"
+        )}
+
+        iterator = self.api.GetIterator()
+        if iterator is None:
+            return data
+
+        block_num = par_num = line_num = word_num = 0
+
+        for word in self._tesserocr.iterate_level(iterator, RIL.WORD):
+            if word.IsAtBeginningOf(RIL.BLOCK):
+                block_num += 1
+                par_num = line_num = word_num = 0
+            if word.IsAtBeginningOf(RIL.PARA):
+                par_num += 1
+                line_num = word_num = 0
+            if word.IsAtBeginningOf(RIL.TEXTLINE):
+                line_num += 1
+                word_num = 0
+            word_num += 1
+
+            bbox = word.BoundingBox(RIL.WORD)
+            if bbox is None:
+                continue
+            x0, y0, x1, y1 = bbox
+
+            data["level"].append(5)
+            data["page_num"].append(1)
+            data["block_num"].append(block_num)
+            data["par_num"].append(par_num)
+            data["line_num"].append(line_num)
+            data["word_num"].append(word_num)
+            data["left"].append(x0)
+            data["top"].append(y0)
+            data["width"].append(x1 - x0)
+            data["height"].append(y1 - y0)
+            data["conf"].append(word.Confidence(RIL.WORD))
+            data["text"].append(word.GetUTF8Text(RIL.WORD) or "")
+
+        return data
+
+
+ENGINES = {
+    PytesseractEngine.name: PytesseractEngine,
+    TesserocrEngine.name: TesserocrEngine,
+}
+
+_settings = {"backend": "auto", "lang": "eng"}
+_local = threading.local()
+
+
+def configure_engine(backend="auto", lang="eng"):
+    """
+    Set the process-wide default backend: "pytesseract", "tesserocr", or
+    "auto" (tesserocr when it is installed and can load `lang`, else
+    pytesseract). Call it from the main thread: the backend is resolved
+    and imported here (see prepare_engine).
+    """
+    if backend != "auto" and backend not in ENGINES:
+        raise ValueError(f"Unknown OCR backend: {backend}")
+
+    _settings["backend"] = backend
+    _settings["lang"] = lang
+    prepare_engine()
+
+
+def prepare_engine():
+    """
+    Resolve "auto" to a concrete backend and import its library on the
+    calling thread, so that engines can then be created on any thread:
+    tesserocr imports cysignals, whose first import installs signal
+    handlers and raises ValueError anywhere but the main thread.
+    """
+    lang = _settings["lang"]
+
+    if _settings["backend"] == "tesserocr":
+        import tesserocr  # noqa: F401
+        return
+
+    if _settings["backend"] != "auto":
+        return
+
+    try:
+        engine = TesserocrEngine(lang=lang)
+    except Exception:
+        _settings["backend"] = "pytesseract"
+        return
+
+    # Keep the probe as this thread's engine rather than loading it twice
+    _settings["backend"] = "tesserocr"
+    engines = getattr(_local, "engines", None)
+    if engines is None:
+        engines = _local.engines = {}
+    engines[("tesserocr", lang)] = engine
+
+
+def get_engine_settings():
+    return dict(_settings)
+
+
+def _create_engine(backend, lang):
+    if backend != "auto":
+        return ENGINES[backend](lang=lang)
+
+    # Not prepared: the import can fail in ways other than ImportError
+    # (see prepare_engine)
+    try:
+        return TesserocrEngine(lang=lang)
+    except Exception:
+        return PytesseractEngine(lang=lang)
+
+
+def get_engine(backend=None, lang=None):
+    """
+    Return this thread's warm engine, creating it on first use. Engines
+    are reused for every later page handled by the same thread.
+    """
+    backend = backend or _settings["backend"]
+    lang = lang or _settings["lang"]
+
+    engines = getattr(_local, "engines", None)
+    if engines is None:
+        engines = _local.engines = {}
+
+    key = (backend, lang)
+    if key not in engines:
+        engines[key] = _create_engine(backend, lang)
+
+    return engines[key]
@@ -0,0 +1,206 @@
+import cv2
+import numpy as np
+
+# Region proposal runs on the binarized page shrunk by this factor
+DOWNSCALE = 4
+
+# Closing kernel (in downscaled px): wide enough to join the glyphs and
+# words of a line, short enough to keep separate lines apart
+CLOSE_KERNEL = (9, 3)
+
+# Components smaller than this (full-res px) are specks, not text
+MIN_REGION_AREA = 150
+MIN_REGION_HEIGHT = 8
+
+# Text is far sparser than this; denser regions are white-on-dark
+# headers (OCR-ed inverted) or, above SOLID_DENSITY, solid bars and
+# filled shapes with nothing to read
+INVERTED_DENSITY = 0.5
+SOLID_DENSITY = 0.95
+
+# Padding around each crop (full-res px); Tesseract needs some white
+# space around glyphs, and padded regions that touch are merged
+PADDING = 12
+
+# Above this share of the page, cropping saves little; OCR the full page
+MAX_REGION_COVERAGE = 0.7
+
+# Regions holding less than this share of the page's ink missed most of
+# it (e.g. a photographed page binarized into large dark areas); OCR the
+# full page instead
+MIN_INK_SHARE = 0.5
+
+
+def region_settings():
+    """Everything that changes the proposed regions (used in OCR cache keys)."""
+    return {
+        "downscale": DOWNSCALE,
+        "close_kernel": list(CLOSE_KERNEL),
+        "min_area": MIN_REGION_AREA,
+        "min_height": MIN_REGION_HEIGHT,
+        "inverted_density": INVERTED_DENSITY,
+        "solid_density": SOLID_DENSITY,
+        "padding": PADDING,
+        "max_coverage": MAX_REGION_COVERAGE,
+        "min_ink_share": MIN_INK_SHARE
+    }
+
+
+def _merge_boxes(boxes):
+    """
+    Merge overlapping (x0, y0, x1, y1, inverted) boxes of the same kind
+    until none overlap.
+    """
+    boxes = [list(b) for b in boxes]
+
+    merged = True
+    while merged:
+        merged = False
+        result = []
+        for box in boxes:
+            for other in result:
+                if (
+                    box[4] == other[4]
+                    and box[0] < other[2] and other[0] < box[2]
+                    and box[1] < other[3] and other[1] < box[3]
+                ):
+                    other[0] = min(other[0], box[0])
+                    other[1] = min(other[1], box[1])
+                    other[2] = max(other[2], box[2])
+                    other[3] = max(other[3], box[3])
+                    merged = True
+                    break
+            else:
+                result.append(box)
+        boxes = result
+
+    return boxes
+
+
+def find_text_regions(binary, scale=1.0):
+    """
+    Propose text regions on a preprocess_image() output (dark text on a
+    white background). Returns padded (x0, y0, x1, y1, inverted) pixel
+    boxes in reading order (top → bottom, then left → right); `inverted`
+    regions hold light text on a dark fill.
+
+    The constants above are tuned for 300 DPI rasters; `scale` is the
+    raster's DPI / 300 (e.g. 1/3 for a 100 DPI layout pass).
+    """
+    height, width = binary.shape[:2]
+
+    downscale = max(1, round(DOWNSCALE * scale))
+    kernel_scale = DOWNSCALE * scale / downscale
+    close_kernel = (
+        max(1, round(CLOSE_KERNEL[0] * kernel_scale)),
+        max(1, round(CLOSE_KERNEL[1] * kernel_scale))
+    )
+    min_area = MIN_REGION_AREA * scale * scale
+    min_height = MIN_REGION_HEIGHT * scale
+    padding = round(PADDING * scale)
+
+    ink = binary < 128
+    small = cv2.resize(
+        ink.astype(np.uint8) * 255,
+        (max(1, width // downscale), max(1, height // downscale)),
+        interpolation=cv2.INTER_AREA
+    ) > 0
+
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, close_kernel)
+    closed = cv2.morphologyEx(small.astype(np.uint8), cv2.MORPH_CLOSE, kernel)
+
+    count, _, stats, _ = cv2.connectedComponentsWithStats(closed, connectivity=8)
+
+    boxes = []
+    for x, y, w, h, _ in stats[1:].tolist():
+        x0, y0 = x * downscale, y * downscale
+        x1, y1 = min(width, (x + w) * downscale), min(height, (y + h) * downscale)
+
+        area = (x1 - x0) * (y1 - y0)
+        if area < min_area or (y1 - y0) < min_height:
+            continue
+
+        density = ink[y0:y1, x0:x1].mean()
+        if density > SOLID_DENSITY:
+            continue
+
+        # Padding a dark fill would add a light frame; keep the fill's edges
+        pad = 0 if density > INVERTED_DENSITY else padding
+        boxes.append((
+            max(0, x0 - pad), max(0, y0 - pad),
+            min(width, x1 + pad), min(height, y1 + pad),
+            bool(density > INVERTED_DENSITY)
+        ))
+
+    boxes = _merge_boxes(boxes)
+    boxes.sort(key=lambda b: (b[1], b[0]))
+
+    return [tuple(b) for b in boxes]
+
+
+def region_coverage(regions, shape):
+    height, width = shape[:2]
+    if not width or not height:
+        return 0.0
+    return sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1, _ in regions) / (width * height)
+
+
+def region_ink_share(regions, binary):
+    """Share of the binarized page's ink inside `regions` (0.0 for a blank page)."""
+    ink = binary < 128
+    total = int(ink.sum())
+    if not total:
+        return 0.0
+
+    mask = np.zeros(ink.shape, dtype=bool)
+    for x0, y0, x1, y1, _ in regions:
+        mask[y0:y1, x0:x1] = True
+    return int(ink[mask].sum()) / total
+
+
+def use_regions(regions, binary):
+    """
+    Whether OCR-ing only `regions` pays off: they must hold most of the
+    page's ink (MIN_INK_SHARE) without covering most of the page
+    (MAX_REGION_COVERAGE).
+    """
+    if not regions:
+        return False
+    if region_coverage(regions, binary.shape) > MAX_REGION_COVERAGE:
+        return False
+    return region_ink_share(regions, binary) >= MIN_INK_SHARE
+
+
+def glyph_heights(binary, box=None):
+    """
+    Heights (px) of the glyph-sized ink components of a binarized raster,
+    or of its `box` ((x0, y0, x1, y1, ...)).
+    """
+    if box is not None:
+        x0, y0, x1, y1 = box[:4]
+        binary = binary[y0:y1, x0:x1]
+    if not binary.size:
+        return np.empty(0, dtype=np.int32)
+
+    ink = (binary < 128).astype(np.uint8)
+    _, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    stats = stats[1:]
+
+    # Specks and punctuation are too small, rules and image blobs too
+    # wide, to say anything about the font size
+    heights = stats[:, cv2.CC_STAT_HEIGHT]
+    widths = stats[:, cv2.CC_STAT_WIDTH]
+    return heights[(heights >= 2) & (widths <= 3 * heights)]
+
+
+def glyph_height(binary, box=None):
+    """
+    Median height (px) of the glyph-sized ink components of a binarized
+    raster, or of its `box` ((x0, y0, x1, y1, ...)); 0 when there are none.
+    Mixed-case text lands between x-height and cap height.
+    """
+    glyphs = glyph_heights(binary, box)
+
+    if not len(glyphs):
+        return 0.0
+    return float(np.median(glyphs))
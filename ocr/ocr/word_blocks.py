@@ -1,31 +1,159 @@
-import pytesseract
-from pytesseract import Output
-from ocr.block_factory import create_block
+import cv2
+import numpy as np
 
-def extract_word_blocks(image, page_num):
-    data = pytesseract.image_to_data(image, output_type=Output.DICT)
-    blocks = []
+from ocr.page_model import WordTable
+from ocr.tesseract_engine import get_engine
 
+TESSERACT_COLUMNS = (
+    "level", "page_num", "block_num", "par_num", "line_num", "word_num",
+    "left", "top", "width", "height", "conf", "text"
+)
+
+def extract_word_table(image, page_num, engine=None):
+    """
+    OCR an image into a columnar WordTable. Tesseract's own layout
+    hierarchy is kept so LINE and PARAGRAPH blocks can be built without
+    re-clustering.
+
+    `engine` is an engine instance or backend name ("pytesseract",
+    "tesserocr", "auto"); by default the thread's configured engine is
+    used (see tesseract_engine.configure_engine).
+    """
+    if engine is None or isinstance(engine, str):
+        engine = get_engine(engine)
+
+    data = engine.image_to_data(image)
     h, w = image.shape[:2]
 
-    for i, text in enumerate(data["text"]):
-        if not text.strip():
-            continue
-
-        block = create_block(
-            "WORD",
-            Text=text.strip(),
-            Confidence=float(data["conf"][i]),
-            Page=page_num,
-            Geometry={
-                "BoundingBox": {
-                    "Left": data["left"][i] / w,
-                    "Top": data["top"][i] / h,
-                    "Width": data["width"][i] / w,
-                    "Height": data["height"][i] / h
-                }
-            }
-        )
-        blocks.append(block)
-
-    return blocks
\ No newline at end of file
+    return WordTable.from_tesseract(data, w, h, page_num)
+
+
+def _ocr_region(image, region, engine):
+    x0, y0, x1, y1, inverted = region
+    crop = np.ascontiguousarray(image[y0:y1, x0:x1])
+    if inverted:
+        crop = cv2.bitwise_not(crop)
+
+    return _ocr_crop(crop, engine)
+
+
+def _ocr_crop(crop, engine, psm=None):
+    if engine is None or isinstance(engine, str):
+        engine = get_engine(engine)
+    if psm is None:
+        return engine.image_to_data(crop)
+    return engine.image_to_data(crop, psm=psm)
+
+
+def _pool_engine(engine):
+    # A TessBaseAPI must not be shared between threads: each pool thread
+    # reads with its own warm engine of the same backend and language
+    return get_engine(getattr(engine, "name", engine), getattr(engine, "lang", None))
+
+
+def ocr_crops(crops, engine=None, executor=None, psm=None):
+    """
+    Tesseract data for each of `crops` (binarized images), in order,
+    optionally with a page segmentation mode `psm` (e.g. 7: single line).
+
+    Crops are read one after another with `engine` (by default this
+    thread's engine). With an `executor` (a thread pool owned by the
+    caller) they are OCR-ed concurrently on its threads instead.
+    """
+    if executor is not None and len(crops) > 1:
+        return list(executor.map(
+            lambda crop: _ocr_crop(crop, _pool_engine(engine), psm), crops
+        ))
+    return [_ocr_crop(crop, engine, psm) for crop in crops]
+
+
+def mean_confidence(data):
+    """Mean Tesseract confidence of a crop's words (-1 when it read none)."""
+    confs = [
+        float(conf)
+        for text, conf in zip(data["text"], data["conf"])
+        if text.strip() and float(conf) >= 0
+    ]
+    return sum(confs) / len(confs) if confs else -1.0
+
+
+def merge_region_word_table(results, regions, shape, page_num):
+    """
+    Merge per-region Tesseract `results` into one page WordTable.
+
+    `results` holds (data, crop_width, crop_height) per region of
+    `regions` ((x0, y0, x1, y1, ...) boxes on a page raster of `shape`).
+    Crops may have been rendered at another resolution than that raster:
+    word boxes are scaled from crop pixels onto the region's box, shifted
+    onto the page and then normalized. Each crop's Tesseract block
+    numbers are offset so blocks from different crops never merge into
+    one line.
+    """
+    merged = {key: [] for key in TESSERACT_COLUMNS}
+    block_offset = 0
+
+    for (x0, y0, x1, y1, *_), (data, crop_w, crop_h) in zip(regions, results):
+        count = len(data["text"])
+        for key in TESSERACT_COLUMNS:
+            if key in data:
+                merged[key].extend(data[key])
+            else:
+                merged[key].extend([0] * count)
+
+        sx = (x1 - x0) / crop_w if crop_w else 1
+        sy = (y1 - y0) / crop_h if crop_h else 1
+
+        start = len(merged["text"]) - count
+        for i in range(start, start + count):
+            if sx != 1 or sy != 1:
+                merged["left"][i] *= sx
+                merged["top"][i] *= sy
+                merged["width"][i] *= sx
+                merged["height"][i] *= sy
+            merged["left"][i] += x0
+            merged["top"][i] += y0
+            merged["block_num"][i] += block_offset
+
+        if count:
+            block_offset = max(merged["block_num"][start:])
+
+    h, w = shape[:2]
+    return WordTable.from_tesseract(merged, w, h, page_num)
+
+
+def extract_region_word_table(image, page_num, regions, engine=None, executor=None):
+    """
+    OCR only the `regions` (see text_regions.find_text_regions) of a
+    preprocessed page and merge them into one page WordTable (see
+    merge_region_word_table), reading the crops with `engine` or on
+    `executor`'s threads (see ocr_crops).
+    """
+    if executor is not None and len(regions) > 1:
+        data = list(executor.map(
+            lambda region: _ocr_region(image, region, _pool_engine(engine)), regions
+        ))
+    else:
+        data = [_ocr_region(image, region, engine) for region in regions]
+
+    results = [
+        (d, x1 - x0, y1 - y0)
+        for d, (x0, y0, x1, y1, _) in zip(data, regions)
+    ]
+    return merge_region_word_table(results, regions, image.shape, page_num)
+
+
+def extract_word_blocks(image, page_num, engine=None):
+    return extract_word_table(image, page_num, engine).to_blocks()
+
+
+def build_text_layer_word_table(text_words, page_num):
+    """
+    Build a WordTable from a PDF text layer (see
+    pdf_loader.extract_text_layer_words). Embedded text is exact, so
+    Confidence is reported as 100.
+    """
+    return WordTable.from_text_layer(text_words, page_num)
+
+
+def build_text_layer_word_blocks(text_words, page_num):
+    return build_text_layer_word_table(text_words, page_num).to_blocks()
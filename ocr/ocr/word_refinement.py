@@ -0,0 +1,214 @@
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+
+from ocr.pdf_loader import render_page
+from ocr.image_preprocessor import preprocess_image
+from ocr.page_model import WordTable
+from ocr.block_factory import new_ids
+from ocr.word_blocks import ocr_crops, mean_confidence
+
+# Words below this confidence get their line re-OCR-ed
+MIN_CONFIDENCE = 60
+
+# Weak lines are re-rendered at this multiple of the page DPI (capped),
+# or upsampled from the page raster when the PDF page is not available
+SCALE = 2
+MAX_DPI = 600
+
+# Padding around each line crop, as a fraction of the line height
+PADDING = 0.3
+
+# Tesseract page segmentation mode for the crops: a single text line
+LINE_PSM = 7
+
+# Upper bound on re-OCR-ed lines per page (a page of noise is not worth it)
+MAX_LINES = 200
+
+
+def refine_settings():
+    """Everything that changes refine_weak_words' output (used in OCR cache keys)."""
+    return {
+        "min_confidence": MIN_CONFIDENCE,
+        "scale": SCALE,
+        "max_dpi": MAX_DPI,
+        "padding": PADDING,
+        "psm": LINE_PSM,
+        "max_lines": MAX_LINES,
+        "variants": ["otsu", "adaptive"]
+    }
+
+
+def weak_lines(words):
+    """
+    Indices of the words of each line holding a word below
+    MIN_CONFIDENCE, in page order. Lines follow Tesseract's own layout.
+    """
+    if words.layout is None or not len(words):
+        return []
+
+    weak = words.confidence < MIN_CONFIDENCE
+    if not weak.any():
+        return []
+
+    lines = {}
+    for i, key in enumerate(map(tuple, words.layout.tolist())):
+        lines.setdefault(key, []).append(i)
+
+    return [
+        indices for indices in lines.values()
+        if weak[indices].any()
+    ][:MAX_LINES]
+
+
+def _line_box(words, indices):
+    """Padded normalized (left, top, right, bottom) box of a line, clipped to the page."""
+    left = words.left[indices].min()
+    top = words.top[indices].min()
+    right = words.right[indices].max()
+    bottom = words.bottom[indices].max()
+
+    pad = (bottom - top) * PADDING
+    return (
+        max(0.0, left - pad), max(0.0, top - pad),
+        min(1.0, right + pad), min(1.0, bottom + pad)
+    )
+
+
+def _render_line(page, box):
+    """Raw (unbinarized) crop of `box` at SCALE x the page resolution."""
+    left, top, right, bottom = box
+    pdf_page = page.get("pdf_page")
+
+    if pdf_page is not None:
+        dpi = int(min(MAX_DPI, (page.get("fine_dpi") or page["dpi"]) * SCALE))
+        rect = pdf_page.rect
+        clip = fitz.Rect(
+            left * rect.width, top * rect.height,
+            right * rect.width, bottom * rect.height
+        )
+        return render_page(pdf_page, dpi, clip=clip)
+
+    image = page["image"]
+    h, w = image.shape[:2]
+    crop = image[int(top * h):int(np.ceil(bottom * h)), int(left * w):int(np.ceil(right * w))]
+    return cv2.resize(crop, None, fx=SCALE, fy=SCALE, interpolation=cv2.INTER_CUBIC)
+
+
+def _dark_text(binary):
+    # Lines from white-on-dark headers come out inverted
+    if binary.mean() < 128:
+        return cv2.bitwise_not(binary)
+    return binary
+
+
+def _variants(crop):
+    """The line binarized two ways: the page's Otsu path and an adaptive threshold."""
+    otsu = preprocess_image(crop)
+
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    block = max(3, (crop.shape[0] // 2) | 1)
+    adaptive = cv2.adaptiveThreshold(
+        cv2.GaussianBlur(gray, (3, 3), 0), 255,
+        cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, block, 10
+    )
+
+    return [_dark_text(otsu), _dark_text(adaptive)]
+
+
+def refine_weak_words(words, page, engine=None, profile=None, executor=None):
+    """
+    Re-OCR the lines of `words` (a page's Tesseract WordTable) that hold
+    weak words: each line is re-rendered at a higher resolution,
+    binarized two ways and read as a single line (all crops of the page in
+    one batch), and the best-scoring reading replaces the line when it
+    beats the original's mean confidence. Cost grows with the number of
+    weak lines, not with the page.
+    """
+    lines = [
+        indices for indices in weak_lines(words)
+        if words.width[indices].max() > 0 and words.height[indices].max() > 0
+    ]
+
+    if profile is not None:
+        profile.count("weak_words", int((words.confidence < MIN_CONFIDENCE).sum()))
+        profile.count("refined_lines", len(lines))
+
+    if not lines:
+        return words
+
+    boxes = [_line_box(words, indices) for indices in lines]
+    crops = []
+    for box in boxes:
+        crops.extend(_variants(_render_line(page, box)))
+
+    results = ocr_crops(crops, engine, executor, psm=LINE_PSM)
+
+    replacements = {}
+    for n, (indices, box) in enumerate(zip(lines, boxes)):
+        current = float(words.confidence[indices].mean())
+
+        candidates = [
+            (mean_confidence(results[2 * n + v]), crops[2 * n + v], results[2 * n + v])
+            for v in range(2)
+        ]
+        score, crop, data = max(candidates, key=lambda c: c[0])
+        if score <= current:
+            continue
+
+        replacements[indices[0]] = (indices, box, crop, data)
+
+    if profile is not None:
+        profile.count("improved_lines", len(replacements))
+
+    if not replacements:
+        return words
+
+    return _replace_lines(words, replacements)
+
+
+def _replace_lines(words, replacements):
+    """
+    Rebuild the table with each replaced line's new words in its old
+    place, numbering the words in their final page order.
+    """
+    replaced = set()
+    for indices, *_ in replacements.values():
+        replaced.update(indices)
+
+    texts, left, top, width, height, conf, layout = ([] for _ in range(7))
+
+    for i in range(len(words)):
+        if i in replacements:
+            indices, box, crop, data = replacements[i]
+            x0, y0, x1, y1 = box
+            crop_h, crop_w = crop.shape[:2]
+            sx = (x1 - x0) / crop_w
+            sy = (y1 - y0) / crop_h
+
+            keep = [k for k, text in enumerate(data["text"]) if text.strip()]
+            texts.extend(data["text"][k].strip() for k in keep)
+            left.extend(x0 + data["left"][k] * sx for k in keep)
+            top.extend(y0 + data["top"][k] * sy for k in keep)
+            width.extend(data["width"][k] * sx for k in keep)
+            height.extend(data["height"][k] * sy for k in keep)
+            conf.extend(float(data["conf"][k]) for k in keep)
+            layout.extend([words.layout[i].tolist()] * len(keep))
+
+        elif i not in replaced:
+            texts.append(words.texts[i])
+            left.append(words.left[i])
+            top.append(words.top[i])
+            width.append(words.width[i])
+            height.append(words.height[i])
+            conf.append(words.confidence[i])
+            layout.append(words.layout[i].tolist())
+
+    # Ids follow the final word order, as when the table is rebuilt from
+    # the OCR cache: the page's existing ids first, new ones past them
+    ids = list(words.ids[:len(texts)])
+    ids.extend(new_ids("WORD", len(texts) - len(ids)))
+
+    return WordTable(
+        words.page_num, texts, left, top, width, height, conf, layout=layout, ids=ids
+    )
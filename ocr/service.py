@@ -0,0 +1,470 @@
+"""
+Local OCR HTTP service.
+
+Keeps the OCR stack imported and one warm engine per worker thread, so
+upstream services don't each cold-start cv2/fitz/Tesseract:
+
+    python service.py serve --port 8080
+    curl --data-binary @data/testing.pdf -H "Content-Type: application/pdf" \
+        "http://127.0.0.1:8080/ocr?format=structured"
+
+POST /ocr takes the raw PDF as the request body. Query parameters:
+
+    format=blocks      {"DocumentMetadata": ..., "Blocks": [...]} (default)
+    format=structured  {"pages": [...]} as in output_blocks_structured.json
+    stream=1           chunked NDJSON, sent page by page as pages finish
+                       (one block / structured page per line, then a
+                       trailing {"DocumentMetadata": ...} record)
+
+At most SERVICE_MAX_IN_FLIGHT_PAGES pages are queued or running at once;
+an upload that doesn't fit is rejected with 429 and a Retry-After
+estimate. GET /health reports the current load.
+
+    python service.py load-test data/testing.pdf --requests 50 --concurrency 8
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import select
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from config import (
+    DPI, OCR_LANG, OCR_ENGINE, USE_TEXT_LAYER, TEXT_LAYER_MIN_WORDS, SKIP_BLANK_PAGES,
+    USE_EMBEDDED_IMAGES, RENDER_GRAYSCALE, ADAPTIVE_DPI,
+    TEXT_REGIONS, COARSE_DPI, REFINE_WEAK_WORDS, DESKEW_PAGES,
+    OCR_CACHE_DIR, OCR_CACHE_MAX_BYTES, BLOCK_ID_FORMAT,
+    SERVICE_HOST, SERVICE_PORT, SERVICE_WORKERS, SERVICE_MAX_IN_FLIGHT_PAGES,
+    SERVICE_MAX_UPLOAD_BYTES
+)
+
+from ocr.pipeline import iter_page_blocks
+from ocr.pdf_loader import count_pages
+from ocr.block_factory import set_id_format
+from ocr.tesseract_engine import configure_engine, get_engine
+from ocr.ocr_cache import OcrCache
+from ocr.readable_formatter import create_structured_json
+
+# While waiting for a page, the client connection is checked this often
+# (seconds); once it has closed, the upload's remaining pages are dropped
+DISCONNECT_POLL_SECONDS = 0.5
+
+
+class PageBudget:
+    """Counts pages admitted but not finished; admission is all-or-nothing per upload."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self, pages):
+        with self._lock:
+            if self.in_flight + pages > self.capacity:
+                return False
+            self.in_flight += pages
+            return True
+
+    def release(self, pages=1):
+        with self._lock:
+            self.in_flight -= pages
+
+
+class OcrService:
+    """
+    Shared state behind the HTTP handlers: the page worker pool (one warm
+    engine per thread), the in-flight page budget and a running page-time
+    average used for Retry-After.
+    """
+
+    def __init__(self, workers=SERVICE_WORKERS, max_in_flight_pages=SERVICE_MAX_IN_FLIGHT_PAGES):
+        configure_engine(OCR_ENGINE, lang=OCR_LANG)
+        set_id_format(BLOCK_ID_FORMAT)
+
+        self.workers = workers or os.cpu_count() or 1
+        self.budget = PageBudget(max_in_flight_pages)
+        self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ocr")
+
+        self.cache = None
+        if OCR_CACHE_DIR:
+            self.cache = OcrCache(OCR_CACHE_DIR, max_bytes=OCR_CACHE_MAX_BYTES)
+
+        self.page_seconds = 1.0
+        self.pages_done = 0
+        self.rejected = 0
+        self._stats_lock = threading.Lock()
+
+        self._warm_up()
+
+    def _warm_up(self):
+        # A barrier makes every pool thread take one task, so each creates
+        # its engine now rather than on the first request
+        barrier = threading.Barrier(self.workers)
+
+        def warm():
+            get_engine()
+            barrier.wait()
+
+        for future in [self.pool.submit(warm) for _ in range(self.workers)]:
+            future.result()
+
+    def _ocr_page(self, pdf_bytes, page_num):
+        start = time.perf_counter()
+        try:
+            for _, blocks in iter_page_blocks(
+                pdf_bytes,
+                dpi=DPI,
+                use_text_layer=USE_TEXT_LAYER,
+                text_layer_min_words=TEXT_LAYER_MIN_WORDS,
+                skip_blank_pages=SKIP_BLANK_PAGES,
+                embedded_images=USE_EMBEDDED_IMAGES,
+                grayscale=RENDER_GRAYSCALE,
+                text_regions=TEXT_REGIONS,
+                # Pages already run concurrently on the pool, each thread
+                # reading its crops with the engine warmed up for it
+                region_threads=1,
+                coarse_dpi=COARSE_DPI,
+                refine_words=REFINE_WEAK_WORDS,
+                deskew=DESKEW_PAGES,
+                adaptive_dpi=ADAPTIVE_DPI,
+                cache=self.cache,
+                page_numbers=[page_num]
+            ):
+                return blocks
+            return []
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._stats_lock:
+                # Exponential moving average of the per-page cost
+                self.page_seconds = 0.8 * self.page_seconds + 0.2 * elapsed
+                self.pages_done += 1
+
+    def reject(self):
+        with self._stats_lock:
+            self.rejected += 1
+
+    def retry_after(self, pages):
+        """Seconds until roughly `pages` slots should be free (1-60)."""
+        backlog = self.budget.in_flight + pages - self.budget.capacity
+        seconds = math.ceil(max(backlog, 1) * self.page_seconds / self.workers)
+        return min(max(seconds, 1), 60)
+
+    def submit(self, pdf_bytes, page_count):
+        """
+        Queue every page of an admitted upload; returns the futures in page
+        order. Each page frees its budget slot when it finishes or is
+        cancelled.
+        """
+        futures = []
+        for page_num in range(1, page_count + 1):
+            future = self.pool.submit(self._ocr_page, pdf_bytes, page_num)
+            future.add_done_callback(lambda _: self.budget.release())
+            futures.append(future)
+        return futures
+
+    def health(self):
+        return {
+            "status": "ok",
+            "workers": self.workers,
+            "in_flight_pages": self.budget.in_flight,
+            "capacity_pages": self.budget.capacity,
+            "pages_done": self.pages_done,
+            "rejected": self.rejected,
+            "page_seconds": self.page_seconds,
+            "ocr_cache": self.cache.stats() if self.cache is not None else None
+        }
+
+    def shutdown(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+
+class OcrRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if urlparse(self.path).path == "/health":
+            self._send_json(200, self.service.health())
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/ocr":
+            self._send_json(404, {"error": "not found"})
+            return
+
+        query = parse_qs(url.query)
+        output = query.get("format", ["blocks"])[0]
+        stream = query.get("stream", ["0"])[0] in ("1", "true", "yes")
+
+        if output not in ("blocks", "structured"):
+            self._send_json(400, {"error": f"unknown format: {output}"})
+            return
+
+        length = self.headers.get("Content-Length")
+        if length is None:
+            self._send_json(411, {"error": "Content-Length required"})
+            return
+        try:
+            length = int(length)
+            if length < 0:
+                raise ValueError(length)
+        except ValueError:
+            # The body can't be delimited, so the connection can't be reused
+            self.close_connection = True
+            self._send_json(400, {"error": f"invalid Content-Length: {length}"})
+            return
+        if length > SERVICE_MAX_UPLOAD_BYTES:
+            self.close_connection = True
+            self._send_json(413, {"error": "upload too large"})
+            return
+
+        pdf_bytes = self.rfile.read(length)
+
+        try:
+            page_count = count_pages(pdf_bytes)
+        except Exception as e:
+            self._send_json(400, {"error": f"not a readable PDF: {e}"})
+            return
+
+        if page_count > self.service.budget.capacity:
+            self._send_json(413, {
+                "error": f"{page_count} pages exceeds the service limit of "
+                         f"{self.service.budget.capacity}"
+            })
+            return
+
+        if not self.service.budget.try_acquire(page_count):
+            self.service.reject()
+            self._send_json(
+                429,
+                {"error": "service saturated", **self.service.health()},
+                {"Retry-After": str(self.service.retry_after(page_count))}
+            )
+            return
+
+        futures = self.service.submit(pdf_bytes, page_count)
+
+        try:
+            if stream:
+                self._stream_pages(futures, output, page_count)
+            else:
+                self._send_document(futures, output, page_count)
+        except (BrokenPipeError, ConnectionResetError):
+            # Client went away (noticed between pages or on a write):
+            # drop its queued pages
+            self.close_connection = True
+        except Exception as e:
+            if not stream:
+                self._send_json(500, {"error": repr(e)})
+            self.close_connection = True
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def _client_gone(self):
+        """
+        True once the client has closed its end. The upload has been read,
+        so the socket only turns readable on EOF (or a pipelined request,
+        which is left unread).
+        """
+        readable, _, _ = select.select([self.connection], [], [], 0)
+        if not readable:
+            return False
+        try:
+            return self.connection.recv(1, socket.MSG_PEEK) == b""
+        except OSError:
+            return True
+
+    def _page_result(self, future):
+        """The page's blocks, raising ConnectionResetError if the client leaves first."""
+        while True:
+            try:
+                return future.result(timeout=DISCONNECT_POLL_SECONDS)
+            except TimeoutError:
+                if self._client_gone():
+                    raise ConnectionResetError("client disconnected")
+
+    def _page_records(self, future, output, page_num):
+        blocks = self._page_result(future)
+        if output == "structured":
+            return [create_structured_json(blocks, page_num)]
+        return blocks
+
+    def _send_document(self, futures, output, page_count):
+        records = []
+        for page_num, future in enumerate(futures, 1):
+            records.extend(self._page_records(future, output, page_num))
+
+        if output == "structured":
+            payload = {"pages": records}
+        else:
+            payload = {"DocumentMetadata": {"Pages": page_count}, "Blocks": records}
+        self._send_json(200, payload)
+
+    def _stream_pages(self, futures, output, page_count):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        # Pages finish out of order across workers; send them in page order
+        for page_num, future in enumerate(futures, 1):
+            try:
+                records = self._page_records(future, output, page_num)
+            except ConnectionResetError:
+                raise
+            except Exception as e:
+                records = [{"Page": page_num, "Error": repr(e)}]
+
+            self._write_chunk(
+                "".join(json.dumps(record) + "\n" for record in records).encode("utf-8")
+            )
+
+        self._write_chunk(
+            (json.dumps({"DocumentMetadata": {"Pages": page_count}}) + "\n").encode("utf-8")
+        )
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+def serve(host=SERVICE_HOST, port=SERVICE_PORT, workers=SERVICE_WORKERS,
+          max_in_flight_pages=SERVICE_MAX_IN_FLIGHT_PAGES, verbose=False):
+    service = OcrService(workers, max_in_flight_pages)
+
+    server = ThreadingHTTPServer((host, port), OcrRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.verbose = verbose
+
+    print(
+        f"✅ OCR service on http://{host}:{server.server_address[1]} "
+        f"({service.workers} warm workers, {max_in_flight_pages} pages in flight)"
+    )
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+def load_test(pdf_path, host=SERVICE_HOST, port=SERVICE_PORT, requests=20, concurrency=4,
+              stream=False):
+    """
+    Fire `requests` uploads of `pdf_path` from `concurrency` client
+    threads; 429 responses are counted (not retried).
+    """
+    with open(pdf_path, "rb") as f:
+        body = f.read()
+
+    path = "/ocr?stream=1" if stream else "/ocr"
+
+    def one():
+        start = time.perf_counter()
+        connection = http.client.HTTPConnection(host, port, timeout=600)
+        try:
+            connection.request("POST", path, body, {"Content-Type": "application/pdf"})
+            response = connection.getresponse()
+            response.read()
+            return response.status, time.perf_counter() - start
+        finally:
+            connection.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = [f.result() for f in as_completed(pool.submit(one) for _ in range(requests))]
+    wall = time.perf_counter() - start
+
+    latencies = sorted(seconds for status, seconds in results if status == 200)
+    statuses = {}
+    for status, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    def percentile(pct):
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(round(pct / 100 * (len(latencies) - 1))))]
+
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "statuses": statuses,
+        "wall_seconds": wall,
+        "requests_per_sec": len(latencies) / wall if wall else 0.0,
+        "p50_seconds": percentile(50),
+        "p95_seconds": percentile(95),
+        "max_seconds": latencies[-1] if latencies else None
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="run the service")
+    serve_parser.add_argument("--host", default=SERVICE_HOST)
+    serve_parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    serve_parser.add_argument("--workers", type=int, default=SERVICE_WORKERS)
+    serve_parser.add_argument("--max-in-flight-pages", type=int,
+                              default=SERVICE_MAX_IN_FLIGHT_PAGES)
+    serve_parser.add_argument("--verbose", action="store_true", help="log every request")
+
+    load_parser = commands.add_parser("load-test", help="load-test a running service")
+    load_parser.add_argument("pdf")
+    load_parser.add_argument("--host", default=SERVICE_HOST)
+    load_parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    load_parser.add_argument("--requests", type=int, default=20)
+    load_parser.add_argument("--concurrency", type=int, default=4)
+    load_parser.add_argument("--stream", action="store_true")
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.command == "serve":
+        serve(args.host, args.port, args.workers, args.max_in_flight_pages, args.verbose)
+        return 0
+
+    report = load_test(
+        args.pdf, args.host, args.port, args.requests, args.concurrency, args.stream
+    )
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from ocr import tesseract_engine
+from ocr.block_factory import set_id_format, get_id_format
+from ocr.ocr_cache import OcrCache
+from ocr.pipeline import iter_page_blocks
+
+PDF_PATH = "data/main_test_file.pdf"
+
+DATA_KEYS = (
+    "level", "page_num", "block_num", "par_num", "line_num", "word_num",
+    "left", "top", "width", "height", "conf", "text"
+)
+
+
+class StubEngine:
+    """
+    Deterministic in-process engine: words derived from the crop's pixels,
+    weak on full pages and confident on single lines, so weak-line
+    refinement replaces lines with a different number of words.
+    """
+
+    name = "stub"
+    lang = "eng"
+    in_process = True
+
+    def image_to_data(self, image, psm=None):
+        rng = random.Random(int(image.sum()) % 100003)
+        h, w = image.shape[:2]
+        data = {key: [] for key in DATA_KEYS}
+
+        lines = 1 if psm == 7 else 6
+        for line in range(1, lines + 1):
+            for word in range(1, rng.randint(2, 6)):
+                data["level"].append(5)
+                data["page_num"].append(1)
+                data["block_num"].append(1)
+                data["par_num"].append(1)
+                data["line_num"].append(line)
+                data["word_num"].append(word)
+                data["left"].append(rng.randint(0, max(0, w - 10)))
+                data["top"].append(rng.randint(0, max(0, h - 10)))
+                data["width"].append(rng.randint(1, max(1, min(40, w))))
+                data["height"].append(rng.randint(1, max(1, min(12, h))))
+                data["conf"].append(90.0 if psm == 7 else rng.choice([30.0, 95.0]))
+                data["text"].append(rng.choice(["Name:", "John", "Smith", "Date", "12/01/2020"]))
+
+        return data
+
+
+@pytest.fixture
+def stub_engine(monkeypatch):
+    monkeypatch.setattr(tesseract_engine, "_create_engine", lambda backend, lang: StubEngine())
+    monkeypatch.setattr(tesseract_engine._local, "engines", {}, raising=False)
+
+    id_format = get_id_format()
+    set_id_format("sequential")
+    yield
+    set_id_format(id_format)
+
+
+def _run(cache):
+    return list(iter_page_blocks(
+        PDF_PATH, dpi=100, page_numbers=[1, 2], refine_words=True, cache=cache
+    ))
+
+
+def test_cold_and_warm_cache_runs_match(stub_engine, tmp_path):
+    cache = OcrCache(str(tmp_path))
+
+    cold = _run(cache)
+    warm = _run(cache)
+
+    assert cache.stats()["hits"] == 2
+    assert warm == cold